@@ -0,0 +1,319 @@
+import time
+
+import numpy as np
+
+from board import DOT, MOVES
+from engine import GOLDEN_GAMMA, MASK_64, VICTORY, DEFEAT, TIMEOUT, splitmix64
+from ghosts import make_strategies
+from main import get_position, read_board
+
+# Outcome codes of the games in a batch
+RUNNING = 0
+OUTCOME_CODES = {VICTORY: 1, DEFEAT: 2, TIMEOUT: 3}
+OUTCOME_NAMES = (None, VICTORY, DEFEAT, TIMEOUT)
+
+# Number of legal moves and k-th legal direction for each of the 16 moves masks
+POPCOUNT = np.array([len(moves) for moves in MOVES], dtype=np.int64)
+KTH_MOVE = np.array([[moves[k] if k < len(moves) else 0 for k in range(4)] for moves in MOVES], dtype=np.int64)
+DIRECTION_BITS = np.array([1, 2, 4, 8], dtype=np.int64)
+# For each moves mask: which of the four directions are legal, and a distance penalty for the others
+LEGAL = (np.arange(16)[:, np.newaxis] & DIRECTION_BITS) != 0
+ILLEGAL_PENALTY = np.where(LEGAL, 0, 1 << 40).astype(np.int64)
+ROW_STEPS = np.array([-1, 1, 0, 0], dtype=np.int64)
+COL_STEPS = np.array([0, 0, -1, 1], dtype=np.int64)
+NO_MOVE = 255
+
+
+def splitmix64_array(values):
+    """
+            SplitMix64 finaliser on an array, matching engine.splitmix64.
+
+            Parameters: values (numpy.ndarray) : uint64 array
+            Returns: mixed (numpy.ndarray) : uint64 array of pseudo-random values
+    """
+    with np.errstate(over="ignore"):
+        values = (values ^ (values >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        values = (values ^ (values >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return values ^ (values >> np.uint64(31))
+
+
+class BatchGames:
+    """
+            K games on the same board advanced in lockstep with NumPy. Follows the rules of engine.GameState, with
+            the same Ghosts' strategies. Ghosts are grouped by what they do in a round, so each group moves in
+            every game at once whatever the number of Ghosts. Game k draws its random numbers like
+            GameState(board, rng=CounterRandom(seeds[k])), so both engines play exactly the same games.
+
+            Parameters: board (Board) : Game board from read_board
+                        seeds (list) : Seed of every game
+                        max_rounds (int) : Number of rounds after which a game ends with a timeout
+                        ghosts (int) : Number of Ghosts to keep from the board (all of them by default)
+                        next_hops (NextHops) : Shortest path table for Ghosts chasing along the maze (optional)
+                        strategies (list) : Names of the Ghosts' strategies, see engine.GameState
+    """
+
+    def __init__(self, board, seeds, max_rounds=1000, ghosts=None, next_hops=None, strategies=None):
+        ghosts_positions = get_position("ghost", board)[:ghosts]
+        games = len(seeds)
+        self.width = board.width
+        self.height = board.height
+        self.max_rounds = max_rounds
+        self.moves = np.frombuffer(bytes(board.moves), dtype=np.uint8).astype(np.int64)
+        self.offsets = np.array(board.offsets, dtype=np.int64)
+        self.row_of, self.col_of = np.divmod(np.arange(board.width * board.height, dtype=np.int64), board.width)
+
+        pacman_row, pacman_col = get_position("pacman", board)
+        self.pacman = np.full(games, pacman_row * board.width + pacman_col, dtype=np.int64)
+        self.ghosts = np.tile(np.array([row * board.width + col for row, col in ghosts_positions], dtype=np.int64),
+                              (games, 1))
+        tiles = np.frombuffer(bytes(board.tiles), dtype=np.uint8).reshape(board.height, board.width)
+        self.dots = np.repeat((tiles == DOT)[np.newaxis], games, axis=0)
+        self._dots_flat = self.dots.reshape(games, -1)
+        self.dots_total = int((tiles == DOT).sum())
+        self.dots_left = np.full(games, self.dots_total, dtype=np.int64)
+        self.rounds = np.zeros(games, dtype=np.int64)
+        self.outcome = np.zeros(games, dtype=np.int8)
+        self.ghost_3_random = True
+        self._group_ghosts(make_strategies(board, strategies, len(ghosts_positions)))
+
+        self.keys = np.array([splitmix64((seed or 0) & MASK_64) for seed in seeds], dtype=np.uint64)
+        self.counters = np.zeros(games, dtype=np.uint64)
+
+        self.next_hops = None
+        if next_hops is not None:
+            self.next_hops = np.frombuffer(next_hops.next_hops, dtype=np.uint8)
+            self.hop_ids = np.array(next_hops.ids, dtype=np.int64)
+            self.hop_size = next_hops.size
+
+    def _group_ghosts(self, strategies):
+        """
+                Sort Ghosts' columns by behaviour, for the rounds where alternating Ghosts move randomly and for the
+                rounds where they chase Pacman.
+
+                Parameters: strategies (list) : One strategy per Ghost from ghosts.make_strategies
+                Returns: N/A
+        """
+        names = [strategy.name for strategy in strategies]
+
+        def columns(*chosen):
+            return np.array([ghost for ghost, name in enumerate(names) if name in chosen], dtype=np.int64)
+
+        # Indexed by ghost_3_random: random and chasing Ghosts when alternating Ghosts chase, then when they do not
+        self.random_columns = (columns("random"), columns("random", "alternating"))
+        self.chasing_columns = (columns("shortest", "alternating"), columns("shortest"))
+        self.greedy_columns = columns("greedy")
+        self.scatter_columns = columns("scatter")
+        self.scatter_homes = np.array([strategy.home[0] * self.width + strategy.home[1] for strategy in strategies
+                                       if strategy.name == "scatter"], dtype=np.int64)
+
+    @property
+    def pacman_positions(self):
+        """
+                Pacman's (row, col) in every game, shape (K, 2).
+        """
+        return np.stack(np.divmod(self.pacman, self.width), axis=-1)
+
+    @property
+    def ghosts_positions(self):
+        """
+                Ghosts' (row, col) in every game, shape (K, n_ghosts, 2).
+        """
+        return np.stack(np.divmod(self.ghosts, self.width), axis=-1)
+
+    def _draw(self, games, stops):
+        """
+                Draw one random integer in range(stop) for each of the chosen games.
+
+                Parameters: games (numpy.ndarray) : Indexes of the games drawing
+                            stops (numpy.ndarray) : Upper bound (excluded) of every draw
+                Returns: values (numpy.ndarray) : Random integers
+        """
+        self.counters[games] += np.uint64(1)
+        with np.errstate(over="ignore"):
+            values = splitmix64_array(self.keys[games] + self.counters[games] * np.uint64(GOLDEN_GAMMA))
+        return (values % stops.astype(np.uint64)).astype(np.int64)
+
+    def _choose(self, games, masks):
+        """
+                Pick a random direction out of each moves mask, without drawing for empty masks.
+
+                Parameters: games (numpy.ndarray) : Indexes of the games
+                            masks (numpy.ndarray) : Moves mask of every game
+                Returns: directions (numpy.ndarray) : Chosen directions, 0 for empty masks
+        """
+        counts = POPCOUNT[masks]
+        directions = np.zeros(len(games), dtype=np.int64)
+        can_move = counts > 0
+        if can_move.any():
+            picks = self._draw(games[can_move], counts[can_move])
+            directions[can_move] = KTH_MOVE[masks[can_move], picks]
+        return directions
+
+    def _move(self, places, directions):
+        """
+                Move heroes in the chosen directions, keeping them in place when a wall is in the way.
+
+                Parameters: places (numpy.ndarray) : Flat indexes of the heroes
+                            directions (numpy.ndarray) : Directions, -1 to stay
+                Returns: places (numpy.ndarray) : Flat indexes after the move
+        """
+        legal = (directions >= 0) & ((self.moves[places] >> np.maximum(directions, 0)) & 1).astype(bool)
+        return np.where(legal, places + self.offsets[np.maximum(directions, 0)], places)
+
+    def _pacman_policy(self, games, places, policy):
+        """
+                Vectorised engine.random_policy ("random") or engine.dot_seeking_policy ("dots").
+
+                Parameters: games (numpy.ndarray) : Indexes of the games
+                            places (numpy.ndarray) : Pacman's flat index in each game
+                            policy (str) : "random" or "dots"
+                Returns: directions (numpy.ndarray) : Pacman's direction in each game
+        """
+        masks = self.moves[places]
+        if policy == "dots":
+            neighbours = np.clip(places[:, np.newaxis] + self.offsets, 0, self._dots_flat.shape[1] - 1)
+            with_dots = LEGAL[masks] & self._dots_flat[games[:, np.newaxis], neighbours]
+            dot_masks = with_dots @ DIRECTION_BITS
+            masks = np.where(dot_masks != 0, dot_masks, masks)
+        elif policy != "random":
+            raise ValueError(f"Unknown batch policy: {policy}")
+        return self._choose(games, masks)
+
+    def _random_ghosts(self, games, places):
+        """
+                Vectorised main.move_ghost_1 for several Ghosts. Each game draws for its Ghosts in their order,
+                skipping boxed in Ghosts, like the Ghosts moved one by one.
+
+                Parameters: games (numpy.ndarray) : Indexes of the games
+                            places (numpy.ndarray) : Ghosts' flat indexes in each game, shape (len(games), n)
+                Returns: places (numpy.ndarray) : Ghosts' flat indexes after their move
+        """
+        masks = self.moves[places]
+        counts = POPCOUNT[masks]
+        can_move = counts > 0
+        draws = self.counters[games][:, np.newaxis] + np.cumsum(can_move, axis=1).astype(np.uint64)
+        self.counters[games] += can_move.sum(axis=1).astype(np.uint64)
+        with np.errstate(over="ignore"):
+            values = splitmix64_array(self.keys[games][:, np.newaxis] + draws * np.uint64(GOLDEN_GAMMA))
+        picks = (values % np.maximum(counts, 1).astype(np.uint64)).astype(np.int64)
+        directions = KTH_MOVE[masks, picks]
+        return np.where(can_move, places + self.offsets[directions], places)
+
+    def _chasing_ghosts(self, places, targets, straight=False):
+        """
+                Vectorised main.move_ghost_2 for several Ghosts, in a straight line or along shortest paths.
+
+                Parameters: places (numpy.ndarray) : Ghosts' flat indexes in each game, shape (len(games), n)
+                            targets (numpy.ndarray) : Flat index each Ghost heads for, broadcast against places
+                            straight (bool) : Chase in a straight line even when a shortest path table is loaded
+                Returns: places (numpy.ndarray) : Ghosts' flat indexes after their move
+        """
+        if self.next_hops is not None and not straight:
+            directions = self.next_hops[self.hop_ids[targets] * self.hop_size + self.hop_ids[places]].astype(np.int64)
+            can_move = directions != NO_MOVE
+            return np.where(can_move, places + self.offsets[np.where(can_move, directions, 0)], places)
+        masks = self.moves[places]
+        # Straight line distances of the four neighbours compared squared, as sqrt keeps their order
+        row_distance = (self.row_of[places] - self.row_of[targets])[..., np.newaxis] + ROW_STEPS
+        col_distance = (self.col_of[places] - self.col_of[targets])[..., np.newaxis] + COL_STEPS
+        distances = row_distance * row_distance + col_distance * col_distance + ILLEGAL_PENALTY[masks]
+        directions = np.argmin(distances, axis=-1)
+        return np.where(masks != 0, places + self.offsets[directions], places)
+
+    def step(self, actions=None, policy="dots"):
+        """
+                Play one round in every running game.
+
+                Parameters: actions (numpy.ndarray) : Pacman's direction in each of the K games (0 - up, 1 - down,
+                                                      2 - left, 3 - right, -1 to stay), or None to use policy
+                            policy (str) : Built-in Pacman policy used when actions is None, "random" or "dots"
+                Returns: running (int) : Number of games still running after the round
+        """
+        games = np.flatnonzero(self.outcome == RUNNING)
+        if not len(games):
+            return 0
+        self.rounds[games] += 1
+        places = self.pacman[games]
+        if actions is None:
+            directions = self._pacman_policy(games, places, policy)
+        else:
+            directions = np.asarray(actions, dtype=np.int64)[games]
+        places = self._move(places, directions)
+        self.pacman[games] = places
+        eaten = self._dots_flat[games, places]
+        self._dots_flat[games, places] = False
+        self.dots_left[games] -= eaten
+
+        # Check if games end after Pacman's move
+        victory = self.dots_left[games] == 0
+        defeat = ~victory & (self.ghosts[games] == places[:, np.newaxis]).any(axis=1)
+        self.outcome[games[victory]] = OUTCOME_CODES[VICTORY]
+        self.outcome[games[defeat]] = OUTCOME_CODES[DEFEAT]
+        going_on = ~(victory | defeat)
+        games = games[going_on]
+        places = places[going_on]
+
+        # Ghosts move
+        ghosts = self.ghosts[games]
+        random_columns = self.random_columns[self.ghost_3_random]
+        chasing_columns = self.chasing_columns[self.ghost_3_random]
+        targets = places[:, np.newaxis]
+        if len(random_columns):
+            ghosts[:, random_columns] = self._random_ghosts(games, ghosts[:, random_columns])
+        if len(chasing_columns):
+            ghosts[:, chasing_columns] = self._chasing_ghosts(ghosts[:, chasing_columns], targets)
+        if len(self.greedy_columns):
+            ghosts[:, self.greedy_columns] = self._chasing_ghosts(ghosts[:, self.greedy_columns], targets, True)
+        if len(self.scatter_columns):
+            ghosts[:, self.scatter_columns] = self._chasing_ghosts(ghosts[:, self.scatter_columns],
+                                                                   self.scatter_homes, True)
+        self.ghosts[games] = ghosts
+        self.ghost_3_random = not self.ghost_3_random
+
+        defeat = (ghosts == places[:, np.newaxis]).any(axis=1)
+        timeout = ~defeat & (self.rounds[games] >= self.max_rounds)
+        self.outcome[games[defeat]] = OUTCOME_CODES[DEFEAT]
+        self.outcome[games[timeout]] = OUTCOME_CODES[TIMEOUT]
+        return int(len(games) - defeat.sum() - timeout.sum())
+
+    def results(self):
+        """
+                Outcome and statistics of every game, like engine.GameState.stats.
+
+                Parameters: N/A
+                Returns: results (list) : One dict per game
+        """
+        return [{"outcome": OUTCOME_NAMES[outcome], "rounds": int(rounds), "dots_eaten": self.dots_total - int(left),
+                 "dots_left": int(left)}
+                for outcome, rounds, left in zip(self.outcome, self.rounds, self.dots_left)]
+
+
+def run_batch(board, games, policy="dots", seed=0, max_rounds=1000, next_hops=None, strategies=None):
+    """
+            Play a batch of seeded games in lockstep until all of them end. Game number i uses seed + i.
+
+            Parameters: board (Board) : Game board from read_board
+                        games (int) : Number of games to play
+                        policy (str) : Built-in Pacman policy, "random" or "dots"
+                        seed (int) : Seed of the first game
+                        max_rounds (int) : Number of rounds after which a game ends with a timeout
+                        next_hops (NextHops) : Shortest path table for Ghosts chasing along the maze (optional)
+                        strategies (list) : Names of the Ghosts' strategies, see engine.GameState
+            Returns: summary (dict) : Outcome counts, rounds played and throughput, like engine.run_batch.
+    """
+    batch = BatchGames(board, range(seed, seed + games), max_rounds, next_hops=next_hops, strategies=strategies)
+    start = time.perf_counter()
+    while batch.step(policy=policy):
+        pass
+    seconds = time.perf_counter() - start
+    summary = {name: int((batch.outcome == code).sum()) for name, code in OUTCOME_CODES.items()}
+    summary["games"] = games
+    summary["steps"] = int(batch.rounds.sum())
+    summary["seconds"] = seconds
+    summary["steps_per_second"] = summary["steps"] / seconds if seconds else 0.0
+    summary["average_rounds"] = summary["steps"] / games if games else 0.0
+    return summary
+
+
+if __name__ == "__main__":
+    print(run_batch(read_board("pacman_board.txt"), 10000))
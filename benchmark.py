@@ -0,0 +1,411 @@
+import argparse
+import contextlib
+import copy
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+from board import DotLayer
+from engine import GameState, dot_seeking_policy
+from entities import Entities
+from loader import load_board
+from main import (read_board, display_board, get_position, count_dots, recount_dots, move_ghosts,
+                  count_distances_to_pacman, draw_heroes)
+from maze import generate_maze, write_board
+
+DEFAULT_SIZES = (50, 200, 1000, 2000)
+STRESS_SIZES = (500, 1000, 2000, 5000)
+DEFAULT_TOLERANCE = 0.25
+STARTUP_TARGET = 0.05
+# Modules that "cli.py play" must leave alone, so scripted games do not pay for features they do not use
+HEAVY_MODULES = ("numpy", "batch_engine", "server", "loadgen", "mcts", "asyncio", "concurrent.futures")
+
+
+def time_call(function, min_time=0.2, repeat=5):
+    """
+            Time a function: call it in loops of growing length until a loop takes min_time, then keep the best of
+            repeat loops.
+
+            Parameters: function (function) : Function without parameters
+                        min_time (float) : Minimum duration of one loop in seconds
+                        repeat (int) : Number of timed loops
+            Returns: seconds (float) : Best time per call
+    """
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or number >= 1 << 20:
+            break
+        number *= 2 if elapsed <= 0 else max(2, min(10, int(min_time / elapsed) + 1))
+    best = elapsed / number
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+
+def benchmark_board(board_path, min_time=0.2, repeat=5, seed=0):
+    """
+            Time every hot function of the game on one board.
+
+            Parameters: board_path (str) : Text file with game board
+                        min_time (float) : Minimum duration of one timed loop in seconds
+                        repeat (int) : Number of timed loops
+                        seed (int) : Seed of the random generator used by the Ghosts and the headless game
+            Returns: results (dict) : Seconds per call of every benchmark
+    """
+    board = read_board(board_path)
+    pacman_position = get_position("pacman", board)
+    ghosts_positions = get_position("ghost", board)[:3]
+    rng = random.Random(seed)
+    new_ghosts_positions = move_ghosts(board, ghosts_positions, pacman_position, "ghost_1", rng)
+    dots = DotLayer(board)
+    dot_index = dots.mask.find(1)
+    dot_position = list(divmod(dot_index, board.width))
+    view = board.copy()
+    view.dirty = set()
+    sink = io.StringIO()
+
+    def print_quietly(function, *args):
+        sink.seek(0)
+        sink.truncate()
+        with contextlib.redirect_stdout(sink):
+            function(*args)
+
+    def eat_dot():
+        # Put the dot back first, so every call eats one like a round where Pacman finds a dot
+        dots.mask[dot_index] = 1
+        dots.remaining += 1
+        recount_dots(dots, dot_position)
+
+    def headless_game():
+        state = GameState(board, seed, max_rounds=200)
+        while state.step(dot_seeking_policy(state)) is None:
+            pass
+
+    benchmarks = {
+        # The first read_board above compiled the board, so the text parser is timed without the cache
+        "read_board": lambda: load_board(board_path, cache=False),
+        "read_board_compiled": lambda: read_board(board_path),
+        "display_board": lambda: print_quietly(display_board, board),
+        "get_position_pacman": lambda: get_position("pacman", board),
+        "get_position_ghost": lambda: get_position("ghost", board),
+        "count_dots": lambda: print_quietly(count_dots, DotLayer(board)),
+        "recount_dots": lambda: print_quietly(eat_dot),
+        "move_ghosts": lambda: move_ghosts(board, ghosts_positions, pacman_position, "ghost_1", rng),
+        "count_distances_to_pacman": lambda: count_distances_to_pacman(board, ghosts_positions[0], pacman_position),
+        "draw_heroes": lambda: draw_heroes(view, dots.mask, pacman_position, new_ghosts_positions,
+                                           [pacman_position] + ghosts_positions),
+        "headless_game": headless_game,
+    }
+    return {name: time_call(function, min_time, repeat) for name, function in benchmarks.items()}
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, min_time=0.2, repeat=5, board_path="pacman_board.txt"):
+    """
+            Run the benchmark suite on the shipped board and on generated boards.
+
+            Parameters: sizes (list) : Sizes of the generated square boards
+                        min_time (float) : Minimum duration of one timed loop in seconds
+                        repeat (int) : Number of timed loops
+                        board_path (str) : Shipped board
+            Returns: report (dict) : Environment and seconds per call of every benchmark, by board
+    """
+    report = {"python": platform.python_version(), "machine": platform.machine(), "boards": {}}
+    report["boards"][os.path.basename(board_path)] = benchmark_board(board_path, min_time, repeat)
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            generated_path = os.path.join(directory, f"generated_{size}x{size}.txt")
+            write_board(generated_path, generate_maze(size, size, seed=size))
+            report["boards"][f"generated_{size}x{size}"] = benchmark_board(generated_path, min_time, repeat)
+    return report
+
+
+def original_get_position(hero, board):
+    """
+            get_position as the original game had it, scanning a board held as a list of lists of characters row
+            by row. Kept unchanged (including how it steps over a second Ghost on a row) to time what every round
+            of the original game cost.
+
+            Parameters: hero (str) : Name of the hero - Pacman or Ghost
+                        board (list) : Game board as a list of rows, each a list of characters
+            Returns: pacman_position/ ghosts_positions (list) : Hero's position on the board
+    """
+    row_number = 0
+    if hero == "pacman":
+        for row in board:
+            if "G" in row:
+                return [row_number, row.index("G")]
+            row_number += 1
+    if hero == "ghost":
+        ghosts_positions = []
+        for row in board:
+            counter = row.count("X")
+            start = 0
+            while counter >= 1:
+                ghosts_positions.append([row_number, row.index("X", start)])
+                start = row.index("X") + 1
+                counter -= 1
+            row_number += 1
+        return ghosts_positions
+
+
+def original_display_board(board):
+    """
+            display_board as the original game had it, turning every place into a string before printing the rows
+            of a board held as a list of lists of characters. Kept unchanged to time what every round of the
+            original game cost.
+
+            Parameters: board (list) : Game board as a list of rows, each a list of characters
+            Returns: N/A
+    """
+    for row in enumerate(board):
+        for col in enumerate(board):
+            board[row[0]][col[0]] = str(board[row[0]][col[0]])
+    for row in enumerate(board):
+        print("".join(board[row[0]]))
+
+
+def stress_board(size, games=3, seed=0, max_rounds=500, min_time=0.05):
+    """
+            Generate a size x size maze and compare the whole-board work the original game did every round with
+            the per-round work of the headless engine.
+
+            Parameters: size (int) : Width and height of the maze
+                        games (int) : Number of headless games to play on it
+                        seed (int) : Seed of the maze and of the first game
+                        max_rounds (int) : Number of rounds after which a game ends with a timeout
+                        min_time (float) : Minimum duration of one timed loop in seconds
+            Returns: results (dict) : Seconds spent on every step, memory taken by the board and steps played
+    """
+    results = {}
+    start = time.perf_counter()
+    rows = generate_maze(size, size, seed)
+    results["generate"] = time.perf_counter() - start
+    with tempfile.TemporaryDirectory() as directory:
+        board_path = os.path.join(directory, f"maze_{size}x{size}.txt")
+        write_board(board_path, rows)
+        start = time.perf_counter()
+        board = read_board(board_path)
+        results["read_board"] = time.perf_counter() - start
+        # The first read left a compiled board next to the text file
+        start = time.perf_counter()
+        read_board(board_path)
+        results["read_board_compiled"] = time.perf_counter() - start
+    results["board_bytes"] = board.nbytes()
+
+    # Whole-board work done every round by the original game, with its own functions on its list of lists
+    # layout: rescanning for the heroes, printing the whole board and deep copying it to log Pacman's moves
+    board_lists = [list(row) for row in rows]
+    results["get_position_per_round"] = time_call(lambda: (original_get_position("pacman", board_lists),
+                                                           original_get_position("ghost", board_lists)), min_time, 1)
+    sink = io.StringIO()
+
+    def display_quietly():
+        sink.seek(0)
+        sink.truncate()
+        with contextlib.redirect_stdout(sink):
+            original_display_board(board_lists)
+
+    results["display_board_per_round"] = time_call(display_quietly, min_time, 1)
+    start = time.perf_counter()
+    copy.deepcopy(board_lists)
+    results["deepcopy_board_per_round"] = time.perf_counter() - start
+    del board_lists
+
+    # Per-round work of the headless engine
+    entities = Entities.from_board(board)
+    setup = play = 0.0
+    steps = 0
+    for game in range(games):
+        start = time.perf_counter()
+        state = GameState(board, seed + game, max_rounds, entities=entities)
+        middle = time.perf_counter()
+        while state.step(dot_seeking_policy(state)) is None:
+            pass
+        setup += middle - start
+        play += time.perf_counter() - middle
+        steps += state.rounds
+    results["game_setup"] = setup / games if games else 0.0
+    results["engine_step"] = play / steps if steps else 0.0
+    results["steps"] = steps
+    return results
+
+
+def run_stress(sizes=STRESS_SIZES, games=3, seed=0, max_rounds=500):
+    """
+            Run the stress mode on generated mazes of growing size.
+
+            Parameters: sizes (list) : Sizes of the generated square mazes, up to maze.MAX_SIZE
+                        games (int) : Number of headless games per maze
+                        seed (int) : Seed of the mazes and games
+                        max_rounds (int) : Number of rounds after which a game ends with a timeout
+            Returns: report (dict) : Environment and stress_board results, by maze
+    """
+    report = {"python": platform.python_version(), "machine": platform.machine(), "boards": {}}
+    for size in sizes:
+        report["boards"][f"maze_{size}x{size}"] = stress_board(size, games, seed, max_rounds)
+    return report
+
+
+def print_stress_report(report):
+    """
+            Display stress mode results, one line per maze.
+
+            Parameters: report (dict) : Report from run_stress
+            Returns: N/A
+    """
+    print(f"{'board':<16}{'generate':>10}{'read':>10}{'reload':>10}{'MB':>8}{'get_pos':>11}{'display':>11}"
+          f"{'deepcopy':>11}{'setup':>11}{'step':>11}")
+    for board_name, results in report["boards"].items():
+        print(f"{board_name:<16}{results['generate']:>9.2f}s{results['read_board']:>9.2f}s"
+              f"{results['read_board_compiled']:>9.2f}s"
+              f"{results['board_bytes'] / 1e6:>8.1f}{results['get_position_per_round'] * 1e3:>9.2f}ms"
+              f"{results['display_board_per_round'] * 1e3:>9.2f}ms{results['deepcopy_board_per_round'] * 1e3:>9.1f}ms"
+              f"{results['game_setup'] * 1e3:>9.2f}ms{results['engine_step'] * 1e6:>9.2f}us")
+
+
+def find_regressions(report, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+            Compare a report with a baseline report.
+
+            Parameters: report (dict) : Report from run_benchmarks
+                        baseline (dict) : Earlier report
+                        tolerance (float) : Allowed slowdown, 0.25 means 25 % slower than the baseline
+            Returns: regressions (list) : Tuples (board, benchmark, baseline seconds, current seconds)
+    """
+    regressions = []
+    for board_name, results in report["boards"].items():
+        baseline_results = baseline.get("boards", {}).get(board_name, {})
+        for name, seconds in results.items():
+            if name in baseline_results and seconds > baseline_results[name] * (1 + tolerance):
+                regressions.append((board_name, name, baseline_results[name], seconds))
+    return regressions
+
+
+def measure_startup(board_path="pacman_board.txt", runs=20):
+    """
+            Time cold starts of "cli.py play --frames 1" in fresh interpreters, from launching the process to the
+            first frame being drawn and the process exiting. Starting an interpreter that does nothing is timed
+            the same way for comparison, and one more run with -X importtime lists the heavy modules loaded.
+
+            Parameters: board_path (str) : Text file with game board
+                        runs (int) : Number of timed starts
+            Returns: results (dict) : Seconds to the first frame (min, median, max), median interpreter start,
+                                      target and heavy modules loaded
+    """
+    command = [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "cli.py"), "play",
+               "--board", board_path, "--render", "plain", "--frames", "1"]
+
+    # Cached bytecode is part of a normal start, so PYTHONDONTWRITEBYTECODE must not make every run recompile
+    environment = {name: value for name, value in os.environ.items() if name != "PYTHONDONTWRITEBYTECODE"}
+
+    def time_runs(arguments):
+        times = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            subprocess.run(arguments, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, env=environment,
+                           check=True)
+            times.append(time.perf_counter() - start)
+        return sorted(times)
+
+    # The first start compiles the board and the modules, later ones find them cached like a scripted job would
+    subprocess.run(command, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, env=environment, check=True)
+    first_frame = time_runs(command)
+    interpreter = time_runs([sys.executable, "-c", "pass"])
+    imports = subprocess.run([sys.executable, "-X", "importtime"] + command[1:], stdin=subprocess.DEVNULL,
+                             stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, env=environment,
+                             check=True).stderr
+    loaded = {line.rsplit("|", 1)[1].strip() for line in imports.splitlines() if line.startswith("import time:")}
+    return {
+        "runs": runs,
+        "first_frame_min": first_frame[0],
+        "first_frame_median": first_frame[runs // 2],
+        "first_frame_max": first_frame[-1],
+        "interpreter_median": interpreter[runs // 2],
+        "target": STARTUP_TARGET,
+        "heavy_modules": sorted(loaded.intersection(HEAVY_MODULES)),
+    }
+
+
+def print_report(report, baseline=None):
+    """
+            Display benchmark results, with the change against the baseline when there is one.
+
+            Parameters: report (dict) : Report from run_benchmarks
+                        baseline (dict) : Earlier report (optional)
+            Returns: N/A
+    """
+    for board_name, results in report["boards"].items():
+        print(board_name)
+        baseline_results = (baseline or {}).get("boards", {}).get(board_name, {})
+        for name, seconds in results.items():
+            change = ""
+            if name in baseline_results:
+                change = f" ({seconds / baseline_results[name] - 1:+.0%})"
+            print(f"    {name:<28}{seconds * 1e6:>14.2f} us{change}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time the hot functions of the game.")
+    parser.add_argument("--board", default="pacman_board.txt", help="shipped board to benchmark")
+    parser.add_argument("--sizes", nargs="*", type=int, default=list(DEFAULT_SIZES))
+    parser.add_argument("--min-time", type=float, default=0.2, help="minimum seconds per timed loop")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", default="benchmark_baseline.json")
+    parser.add_argument("--save-baseline", action="store_true", help="store the results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--stress", nargs="*", type=int, default=None, metavar="SIZE",
+                        help=f"play headless games on generated mazes instead (sizes {STRESS_SIZES} by default)")
+    parser.add_argument("--games", type=int, default=3, help="headless games per maze in stress mode")
+    parser.add_argument("--max-rounds", type=int, default=500, help="rounds per game in stress mode")
+    parser.add_argument("--startup", nargs="?", type=int, const=20, default=None, metavar="RUNS",
+                        help=f"time cold starts of cli.py play to the first frame instead (target "
+                             f"{STARTUP_TARGET * 1000:.0f} ms)")
+    args = parser.parse_args()
+
+    if args.startup is not None:
+        startup = measure_startup(args.board, args.startup)
+        print(f"first frame: min {startup['first_frame_min'] * 1e3:.1f} ms, median "
+              f"{startup['first_frame_median'] * 1e3:.1f} ms, max {startup['first_frame_max'] * 1e3:.1f} ms "
+              f"(interpreter alone {startup['interpreter_median'] * 1e3:.1f} ms, target {STARTUP_TARGET * 1e3:.0f} ms)")
+        if startup["heavy_modules"]:
+            print(f"heavy modules loaded: {', '.join(startup['heavy_modules'])}")
+        sys.exit(1 if startup["first_frame_median"] > STARTUP_TARGET or startup["heavy_modules"] else 0)
+
+    if args.stress is not None:
+        stress_report = run_stress(args.stress or STRESS_SIZES, args.games, max_rounds=args.max_rounds)
+        with open(args.output, "w") as output_file:
+            json.dump(stress_report, output_file, indent=2)
+        print_stress_report(stress_report)
+        sys.exit(0)
+    benchmark_report = run_benchmarks(args.sizes, args.min_time, args.repeat, args.board)
+    with open(args.output, "w") as output_file:
+        json.dump(benchmark_report, output_file, indent=2)
+    baseline_report = None
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as baseline_file:
+            baseline_report = json.load(baseline_file)
+    print_report(benchmark_report, baseline_report)
+    if args.save_baseline:
+        with open(args.baseline, "w") as baseline_file:
+            json.dump(benchmark_report, baseline_file, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+    elif baseline_report is not None:
+        found = find_regressions(benchmark_report, baseline_report, args.tolerance)
+        for board_name, name, before, after in found:
+            print(f"REGRESSION {board_name} {name}: {before * 1e6:.2f} us -> {after * 1e6:.2f} us")
+        if found:
+            sys.exit(1)
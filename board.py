@@ -0,0 +1,260 @@
+WALL = ord("#")
+DOT = ord(".")
+EMPTY = ord(" ")
+PACMAN = ord("G")
+GHOST = ord("X")
+
+# Translation table turning tiles into a dot mask: 1 where there is a dot, 0 elsewhere
+DOTS_MASK = bytes(1 if tile == DOT else 0 for tile in range(256))
+# Translation table turning tiles into an open mask: 1 where there is no wall, 0 elsewhere
+OPEN_MASK = bytes(0 if tile == WALL else 1 for tile in range(256))
+
+# Directions in the order used by the Ghosts: up, down, left, right. Bit d of a moves mask is set when
+# moving in direction d is legal.
+UP = 0
+DOWN = 1
+LEFT = 2
+RIGHT = 3
+# Legal directions for each of the 16 possible moves masks
+MOVES = tuple(tuple(direction for direction in range(4) if mask >> direction & 1) for mask in range(16))
+
+
+class Board:
+    """
+            Game board stored as a flat bytearray of tile characters, row after row, with a neighbour table
+            holding the legal moves of every place as a direction bitmask (see MOVES). The table is built once
+            and kept up to date when walls are edited. When dirty is a set, every place written by set() is added
+            to it so renderers can redraw only those. ghost_strategies holds the names of the Ghosts' strategies
+            given by the board file, if any.
+
+            Parameters: width (int) : Number of columns
+                        height (int) : Number of rows
+                        tiles (bytes) : width * height tile characters (empty tiles by default)
+                        moves (bytes) : Neighbour table saved with the same tiles, built from them by default
+    """
+
+    __slots__ = ("width", "height", "tiles", "moves", "offsets", "dirty", "ghost_strategies")
+
+    def __init__(self, width, height, tiles=None, moves=None):
+        if tiles is None:
+            tiles = bytes([EMPTY]) * (width * height)
+        if len(tiles) != width * height:
+            raise ValueError(f"Expected {width * height} tiles, got {len(tiles)}")
+        self.width = width
+        self.height = height
+        self.tiles = bytearray(tiles)
+        self.offsets = (-width, width, -1, 1)
+        if moves is not None and len(moves) != width * height:
+            raise ValueError(f"Expected {width * height} moves, got {len(moves)}")
+        self.moves = bytearray(moves) if moves is not None else self._build_moves()
+        self.dirty = None
+        self.ghost_strategies = None
+
+    def _build_moves(self):
+        """
+                Build the neighbour table of the whole board. Works on the open mask as one big integer
+                with a byte per place, so every direction is a single shift instead of a loop over places.
+
+                Parameters: N/A
+                Returns: moves (bytearray) : Legal moves bitmask of every place, 0 for walls
+        """
+        size = self.width * self.height
+        if not size:
+            return bytearray()
+        open_places = int.from_bytes(self.tiles.translate(OPEN_MASK), "little")
+        not_first_col = int.from_bytes((b"\x00" + b"\x01" * (self.width - 1)) * self.height, "little")
+        not_last_col = int.from_bytes((b"\x01" * (self.width - 1) + b"\x00") * self.height, "little")
+        row_bits = 8 * self.width
+        up = open_places << row_bits
+        down = open_places >> row_bits
+        left = (open_places << 8) & not_first_col
+        right = (open_places >> 8) & not_last_col
+        moves = open_places * 15 & (up | down << 1 | left << 2 | right << 3)
+        return bytearray(moves.to_bytes(size + self.width + 1, "little")[:size])
+
+    def _update_moves(self, index):
+        """
+                Recompute the neighbour table around one place after its wall status changed.
+
+                Parameters: index (int) : Offset of the edited place in tiles
+                Returns: N/A
+        """
+        row, col = divmod(index, self.width)
+        for place_row, place_col in ((row, col), (row - 1, col), (row + 1, col), (row, col - 1), (row, col + 1)):
+            if 0 <= place_row < self.height and 0 <= place_col < self.width:
+                self.moves[place_row * self.width + place_col] = self._place_moves(place_row, place_col)
+
+    def _place_moves(self, row, col):
+        """
+                Compute the legal moves bitmask of one place.
+
+                Parameters: row, col (int) : Place on the board
+                Returns: mask (int) : Legal moves bitmask, 0 for walls
+        """
+        index = row * self.width + col
+        tiles = self.tiles
+        if tiles[index] == WALL:
+            return 0
+        mask = 0
+        if row > 0 and tiles[index - self.width] != WALL:
+            mask |= 1 << UP
+        if row < self.height - 1 and tiles[index + self.width] != WALL:
+            mask |= 1 << DOWN
+        if col > 0 and tiles[index - 1] != WALL:
+            mask |= 1 << LEFT
+        if col < self.width - 1 and tiles[index + 1] != WALL:
+            mask |= 1 << RIGHT
+        return mask
+
+    @classmethod
+    def from_rows(cls, rows):
+        """
+                Build a board from rows of text.
+
+                Parameters: rows (list) : Board rows as strings, all of the same length
+                Returns: board (Board) : Game board
+        """
+        width = len(rows[0]) if rows else 0
+        for row_number, row in enumerate(rows):
+            if len(row) != width:
+                raise ValueError(f"Row {row_number} has {len(row)} tiles, expected {width}")
+        return cls(width, len(rows), "".join(rows).encode("ascii"))
+
+    def index(self, row, col):
+        """
+                Index of a place in the flat tiles buffer.
+
+                Parameters: row, col (int) : Place on the board
+                Returns: index (int) : Offset in tiles
+        """
+        return row * self.width + col
+
+    def get(self, row, col):
+        """
+                Read the tile on a place.
+
+                Parameters: row, col (int) : Place on the board
+                Returns: tile (str) : Tile character
+        """
+        return chr(self.tiles[row * self.width + col])
+
+    def set(self, row, col, tile):
+        """
+                Write the tile on a place.
+
+                Parameters: row, col (int) : Place on the board
+                            tile (str) : Tile character
+                Returns: N/A
+        """
+        index = row * self.width + col
+        old_tile = self.tiles[index]
+        new_tile = ord(tile)
+        self.tiles[index] = new_tile
+        if self.dirty is not None and old_tile != new_tile:
+            self.dirty.add(index)
+        if (old_tile == WALL) != (new_tile == WALL):
+            self._update_moves(index)
+
+    def is_wall(self, row, col):
+        """
+                Check if there is a wall (#) on a place.
+
+                Parameters: row, col (int) : Place on the board
+                Returns: True/ False (bool) : Boolean value defining if the place is the wall.
+        """
+        return self.tiles[row * self.width + col] == WALL
+
+    def legal_moves(self, row, col):
+        """
+                Directions in which a hero can move from a place.
+
+                Parameters: row, col (int) : Place on the board
+                Returns: directions (tuple) : Subset of UP, DOWN, LEFT, RIGHT
+        """
+        return MOVES[self.moves[row * self.width + col]]
+
+    def row_string(self, row):
+        """
+                Text of one board row.
+
+                Parameters: row (int) : Row number
+                Returns: text (str) : Tiles of the row
+        """
+        start = row * self.width
+        return self.tiles[start:start + self.width].decode("ascii")
+
+    def rows(self):
+        """
+                Text of all board rows.
+
+                Parameters: N/A
+                Returns: rows (list) : Tiles of each row as strings
+        """
+        return [self.row_string(row) for row in range(self.height)]
+
+    def copy(self):
+        """
+                Copy the board.
+
+                Parameters: N/A
+                Returns: board (Board) : Independent copy of the board
+        """
+        board = Board.__new__(Board)
+        board.width = self.width
+        board.height = self.height
+        board.tiles = bytearray(self.tiles)
+        board.offsets = self.offsets
+        board.moves = bytearray(self.moves)
+        board.dirty = None
+        board.ghost_strategies = self.ghost_strategies
+        return board
+
+    def nbytes(self):
+        """
+                Memory taken by tiles and the neighbour table.
+
+                Parameters: N/A
+                Returns: nbytes (int) : Number of bytes
+        """
+        return len(self.tiles) + len(self.moves)
+
+
+class DotLayer:
+    """
+            Dots left on a board, kept apart from its tiles so that drawing heroes never changes them: a byte per
+            place (1 where a dot is left, like GameState.dots) and the number of dots left, so counting them and
+            checking for a victory cost O(1). Places under heroes on the loaded board hold no dot, as in the
+            headless engine.
+
+            Parameters: board (Board) : Game board as loaded
+    """
+
+    __slots__ = ("width", "mask", "remaining")
+
+    def __init__(self, board):
+        self.width = board.width
+        self.mask = board.tiles.translate(DOTS_MASK)
+        self.remaining = self.mask.count(1)
+
+    def has_dot(self, row, col):
+        """
+                Check if a dot is left on a place.
+
+                Parameters: row, col (int) : Place on the board
+                Returns: True/ False (bool) : Boolean value defining if there is a dot on the place.
+        """
+        return self.mask[row * self.width + col] == 1
+
+    def eat(self, row, col):
+        """
+                Remove the dot on a place, if any.
+
+                Parameters: row, col (int) : Place on the board
+                Returns: eaten (bool) : True if there was a dot on the place
+        """
+        index = row * self.width + col
+        if not self.mask[index]:
+            return False
+        self.mask[index] = 0
+        self.remaining -= 1
+        return True
@@ -0,0 +1,328 @@
+import sys
+
+# Only sys is imported up front: every subcommand imports what it needs when it runs, so "play" never loads the
+# NumPy batch engine, the server or the tree search (see benchmark.py --startup), and argparse is only imported
+# for command lines parse_fast cannot handle
+RENDER_MODES = ("auto", "ansi", "plain", "none")
+DEFAULT_BOARD = "pacman_board.txt"
+
+# Options of the game subcommands as (option, kind, default, help). Kind is a type converting the value, bool for
+# flags, list for one or more names and a tuple for a choice between strings.
+GAME_OPTIONS = (
+    ("--board", str, DEFAULT_BOARD, "text file with game board"),
+    ("--ghost-strategies", list, None, "strategy of every Ghost, repeated when there are more Ghosts"),
+    ("--max-fps", float, None, "maximum number of frames per second"),
+    ("--chase", ("greedy", "shortest"), "greedy", "how chasing Ghosts find Pacman"),
+)
+PLAY_OPTIONS = GAME_OPTIONS + (
+    ("--seed", int, None, "seed of the Ghosts' random generator"),
+    ("--render", RENDER_MODES, "auto", "how to draw the board"),
+    ("--telemetry", str, None, "export per-phase timings, counters and memory use to this file (.json or .csv)"),
+    ("--autopilot", bool, False, "let Monte Carlo tree search play Pacman"),
+    ("--budget-ms", float, 20.0, "autopilot's search time per move"),
+    ("--workers", int, 1, "processes searching every autopilot's move"),
+    ("--realtime", bool, False, "Ghosts move every tick, keys need no Enter"),
+    ("--tick-rate", float, 10.0, "ticks per second of --realtime"),
+    ("--frames", int, None, "stop after drawing this many frames"),
+)
+SIMULATE_OPTIONS = GAME_OPTIONS + (
+    ("--seed", int, 0, "seed of the first game, game i uses seed + i"),
+    ("--render", RENDER_MODES, "none", "draw the games unless none"),
+    ("--games", int, 1000, "number of games to play"),
+    ("--max-rounds", int, 1000, "number of rounds after which a game ends with a timeout"),
+    ("--policy", ("random", "dots", "mcts"), "dots", "Pacman's policy"),
+    ("--budget-ms", float, 20.0, "search time per move of --policy mcts"),
+    ("--workers", int, 1, "processes searching every move of --policy mcts"),
+    ("--numpy", bool, False, "step all games in lockstep with the NumPy batch engine"),
+)
+
+
+def play(args):
+    """
+            Play in the console, turn by turn like main.py or in real time.
+
+            Parameters: args (argparse.Namespace) : Parsed options of the play subcommand
+            Returns: N/A
+    """
+    strategies = check_strategies(args.ghost_strategies)
+    if args.realtime:
+        # Real time play draws a frame every tick and reads the keyboard, so these options have no meaning there
+        unused = [option for option, given in (("--frames", args.frames is not None),
+                                               ("--max-fps", args.max_fps is not None),
+                                               ("--autopilot", args.autopilot)) if given]
+        if unused:
+            raise SystemExit(f"cli.py: error: --realtime cannot be used with {', '.join(unused)}")
+        import asyncio
+        from engine import read_board
+        from realtime import check_input, play as play_realtime
+        try:
+            check_input()
+        except ValueError as error:
+            raise SystemExit(f"cli.py: error: {error}")
+        from render import make_renderer
+        from telemetry import make_telemetry
+        board = read_board(args.board)
+        next_hops = None
+        if args.chase == "shortest":
+            from pathfinding import load_next_hops
+            next_hops = load_next_hops(board)
+        print(asyncio.run(play_realtime(board, args.tick_rate, args.seed, next_hops, make_renderer(args.render),
+                                        strategies=strategies, telemetry=make_telemetry(args.telemetry))))
+        return
+    from main import main
+    main(args.render, args.max_fps, args.telemetry, args.budget_ms / 1000 if args.autopilot else None, args.board,
+         args.seed, strategies, args.frames, args.chase, args.workers)
+
+
+def simulate(args):
+    """
+            Play seeded headless games and print a summary.
+
+            Parameters: args (argparse.Namespace) : Parsed options of the simulate subcommand
+            Returns: N/A
+    """
+    strategies = check_strategies(args.ghost_strategies)
+    from engine import read_board
+    board = read_board(args.board)
+    next_hops = None
+    if args.chase == "shortest":
+        from pathfinding import load_next_hops
+        next_hops = load_next_hops(board)
+    if args.numpy:
+        if args.policy == "mcts":
+            raise SystemExit("cli.py: error: the NumPy batch engine only plays the random and dots policies")
+        import batch_engine
+        print(batch_engine.run_batch(board, args.games, args.policy, args.seed, args.max_rounds, next_hops,
+                                     strategies))
+        return
+    if args.policy == "mcts":
+        from mcts import MctsPlayer
+        policy = MctsPlayer(args.budget_ms / 1000, args.workers, seed=args.seed, board=board, next_hops=next_hops)
+    else:
+        from engine import POLICIES
+        policy = POLICIES[args.policy]
+    try:
+        if args.render == "none":
+            from engine import run_batch
+            print(run_batch(board, args.games, policy, args.seed, args.max_rounds, next_hops, strategies))
+        else:
+            from engine import GameState, update_view
+            from render import make_renderer
+            for game in range(args.games):
+                renderer = make_renderer(args.render, max_fps=args.max_fps)
+                state = GameState(board, args.seed + game, args.max_rounds, next_hops=next_hops, strategies=strategies)
+                view = board.copy()
+                try:
+                    renderer.draw(view)
+                    while state.outcome is None:
+                        last_positions = [state.pacman_position] + state.ghosts_positions
+                        state.step(policy(state))
+                        renderer.draw(update_view(view, state, last_positions), force=state.outcome is not None)
+                finally:
+                    renderer.close()
+                print(dict(state.stats(), seed=args.seed + game))
+    finally:
+        if args.policy == "mcts":
+            policy.close()
+    if args.policy == "mcts":
+        print(policy.stats())
+
+
+def benchmark(args):
+    """
+            Run benchmark.py with the remaining options.
+
+            Parameters: args (argparse.Namespace) : Parsed options, args.options holds the ones for benchmark.py
+            Returns: N/A
+    """
+    import runpy
+    sys.argv = ["benchmark.py"] + args.options
+    runpy.run_module("benchmark", run_name="__main__")
+
+
+def replay(args):
+    """
+            Play back a replay, or print the headers of many.
+
+            Parameters: args (argparse.Namespace) : Parsed options of the replay subcommand
+            Returns: N/A
+    """
+    from replay import play_replay, scan_replays
+    if args.scan:
+        for replay_path, replay_header in scan_replays(args.replays):
+            print(replay_path, replay_header)
+        return
+    from main import read_board
+    from render import make_renderer
+    print(play_replay(args.replays[0], read_board(args.board), make_renderer(args.render, max_fps=args.fps),
+                      args.round))
+
+
+def generate(args):
+    """
+            Generate a seeded maze and write it to the board file, or to stdout.
+
+            Parameters: args (argparse.Namespace) : Parsed options of the generate subcommand
+            Returns: N/A
+    """
+    strategies = check_strategies(args.ghost_strategies)
+    from maze import generate_maze, write_board
+    rows = generate_maze(args.width, args.height, args.seed, args.wall_density, args.dots, args.ghosts, args.pacman)
+    write_board(args.board or sys.stdout, rows, strategies)
+
+
+def check_strategies(names):
+    """
+            Check the names given to --ghost-strategies.
+
+            Parameters: names (list) : Strategy names, None when the option was not given
+            Returns: names (list) : The same names, None when the option was not given
+    """
+    if not names:
+        return None
+    from ghosts import parse_strategies
+    try:
+        return parse_strategies(" ".join(names))
+    except ValueError as error:
+        raise SystemExit(f"cli.py: error: {error}")
+
+
+class Arguments:
+    """
+            Parsed options, like the namespace argparse returns.
+
+            Parameters: values (dict) : Value of every option, by attribute name
+    """
+
+    def __init__(self, values):
+        self.__dict__.update(values)
+
+
+def parse_fast(argv, options):
+    """
+            Parse a subcommand's "--option value" and "--flag" arguments without argparse, which takes longer to
+            import than the game takes to start. Anything else (help, "--option=value", unknown options, bad
+            values) is left to argparse, which also reports the errors.
+
+            Parameters: argv (list) : Arguments after the subcommand
+                        options (tuple) : Options of the subcommand, see GAME_OPTIONS
+            Returns: arguments (Arguments) : Parsed options, None if argparse must parse the command line
+    """
+    kinds = {option: kind for option, kind, _, _ in options}
+    values = {option[2:].replace("-", "_"): default for option, _, default, _ in options}
+    index = 0
+    while index < len(argv):
+        option = argv[index]
+        kind = kinds.get(option)
+        index += 1
+        if kind is None:
+            return None
+        if kind is bool:
+            value = True
+        elif kind is list:
+            value = []
+            while index < len(argv) and not argv[index].startswith("-"):
+                value.append(argv[index])
+                index += 1
+            if not value:
+                return None
+        elif index == len(argv):
+            return None
+        else:
+            value = argv[index]
+            index += 1
+            if isinstance(kind, tuple):
+                if value not in kind:
+                    return None
+            else:
+                try:
+                    value = kind(value)
+                except ValueError:
+                    return None
+        values[option[2:].replace("-", "_")] = value
+    return Arguments(values)
+
+
+def add_options(parser, options):
+    """
+            Add a subcommand's options to its argparse parser.
+
+            Parameters: parser (argparse.ArgumentParser) : Parser of the subcommand
+                        options (tuple) : Options of the subcommand, see GAME_OPTIONS
+            Returns: N/A
+    """
+    for option, kind, default, help_text in options:
+        if kind is bool:
+            parser.add_argument(option, action="store_true", help=help_text)
+        elif kind is list:
+            parser.add_argument(option, nargs="+", default=default, metavar="NAME", help=help_text)
+        elif isinstance(kind, tuple):
+            parser.add_argument(option, choices=kind, default=default, help=help_text)
+        else:
+            parser.add_argument(option, type=kind, default=default, help=help_text)
+
+
+def build_parser():
+    """
+            Build the parser of the command line, one subparser per subcommand.
+
+            Parameters: N/A
+            Returns: parser (argparse.ArgumentParser) : Command line parser
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Pacman: play, simulate, benchmark, replay and generate boards.")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+
+    play_parser = subcommands.add_parser("play", help="play in the console")
+    add_options(play_parser, PLAY_OPTIONS)
+    play_parser.set_defaults(handler=play)
+
+    simulate_parser = subcommands.add_parser("simulate", help="play seeded headless games")
+    add_options(simulate_parser, SIMULATE_OPTIONS)
+    simulate_parser.set_defaults(handler=simulate)
+
+    # Options of the benchmark subcommand are left unparsed and passed on to benchmark.py
+    benchmark_parser = subcommands.add_parser("benchmark", help="run benchmark.py, e.g. benchmark --startup",
+                                              add_help=False)
+    benchmark_parser.set_defaults(handler=benchmark)
+
+    replay_parser = subcommands.add_parser("replay", help="play back or summarise replays")
+    replay_parser.add_argument("replays", nargs="+")
+    replay_parser.add_argument("--board", default=DEFAULT_BOARD, help="text file with the replay's board")
+    replay_parser.add_argument("--round", type=int, default=0, help="round to start playback from")
+    replay_parser.add_argument("--fps", type=float, default=10)
+    replay_parser.add_argument("--render", choices=RENDER_MODES, default="auto")
+    replay_parser.add_argument("--scan", action="store_true", help="only print the headers")
+    replay_parser.set_defaults(handler=replay)
+
+    generate_parser = subcommands.add_parser("generate", help="generate a seeded maze")
+    generate_parser.add_argument("width", type=int)
+    generate_parser.add_argument("height", type=int)
+    generate_parser.add_argument("--board", "-o", default=None, help="text file to write (stdout by default)")
+    generate_parser.add_argument("--seed", type=int, default=0)
+    generate_parser.add_argument("--ghost-strategies", nargs="+", default=None, metavar="STRATEGY",
+                                 help="Ghosts' strategies to write below the board")
+    generate_parser.add_argument("--wall-density", type=float, default=0.3, help="share of inner places that are walls")
+    generate_parser.add_argument("--dots", type=float, default=1.0, help="share of open places holding a dot")
+    generate_parser.add_argument("--ghosts", type=int, default=3)
+    generate_parser.add_argument("--pacman", type=int, nargs=2, default=None, metavar=("ROW", "COL"))
+    generate_parser.set_defaults(handler=generate)
+    return parser
+
+
+if __name__ == "__main__":
+    arguments = None
+    fast_subcommands = {"play": (play, PLAY_OPTIONS), "simulate": (simulate, SIMULATE_OPTIONS)}
+    if len(sys.argv) > 1 and sys.argv[1] in fast_subcommands:
+        handler, handler_options = fast_subcommands[sys.argv[1]]
+        arguments = parse_fast(sys.argv[2:], handler_options)
+        if arguments is not None:
+            arguments.handler = handler
+    if arguments is None:
+        parser = build_parser()
+        arguments, other_options = parser.parse_known_args()
+        if other_options and arguments.handler is not benchmark:
+            parser.error(f"unrecognized arguments: {' '.join(other_options)}")
+        arguments.options = other_options
+    arguments.handler(arguments)
@@ -0,0 +1,415 @@
+import random
+import time
+
+from board import DOT, DOTS_MASK, MOVES
+from render import make_renderer
+from entities import Entities
+from ghosts import make_strategies
+from main import read_board, move_hero, move_ghosts, change_ghost_3, draw_heroes
+
+ACTIONS = ("w", "s", "a", "d")
+# Pacman's legal moves for each moves mask of the board's neighbour table
+LEGAL_ACTIONS = tuple([ACTIONS[direction] for direction in moves] for moves in MOVES)
+VICTORY = "victory"
+DEFEAT = "defeat"
+TIMEOUT = "timeout"
+
+MASK_64 = (1 << 64) - 1
+GOLDEN_GAMMA = 0x9E3779B97F4A7C15
+
+
+def splitmix64(value):
+    """
+            SplitMix64 finaliser, mixing a 64-bit integer into a pseudo-random 64-bit integer.
+
+            Parameters: value (int) : 64-bit integer
+            Returns: mixed (int) : Pseudo-random 64-bit integer
+    """
+    value = (value ^ (value >> 30)) * 0xBF58476D1CE4E5B9 & MASK_64
+    value = (value ^ (value >> 27)) * 0x94D049BB133111EB & MASK_64
+    return value ^ (value >> 31)
+
+
+class CounterRandom:
+    """
+            Counter-based random generator: draw n of a game seeded with s is splitmix64(splitmix64(s) + n * gamma).
+            Draws do not depend on any hidden state besides the counter, so the NumPy batch engine can compute the
+            same draws for thousands of games at once. Implements the part of random.Random used by the engine.
+
+            Parameters: seed (int) : Seed of the game
+    """
+
+    def __init__(self, seed=0):
+        self.key = splitmix64((seed or 0) & MASK_64)
+        self.counter = 0
+
+    def next_value(self):
+        """
+                Next 64-bit draw.
+
+                Parameters: N/A
+                Returns: value (int) : Pseudo-random 64-bit integer
+        """
+        self.counter += 1
+        return splitmix64((self.key + self.counter * GOLDEN_GAMMA) & MASK_64)
+
+    def randrange(self, stop):
+        """
+                Random integer in range(stop).
+
+                Parameters: stop (int) : Upper bound, excluded
+                Returns: value (int) : Random integer
+        """
+        return self.next_value() % stop
+
+    def choice(self, sequence):
+        """
+                Random element of a sequence.
+
+                Parameters: sequence (list) : Non-empty sequence
+                Returns: element : Random element
+        """
+        return sequence[self.next_value() % len(sequence)]
+
+    def random(self):
+        """
+                Random float in [0, 1).
+
+                Parameters: N/A
+                Returns: value (float) : Random float
+        """
+        return (self.next_value() >> 11) * (1.0 / (1 << 53))
+
+    def getstate(self):
+        """
+                State of the generator, like random.Random.getstate.
+
+                Parameters: N/A
+                Returns: state (int) : Number of draws so far
+        """
+        return self.counter
+
+    def setstate(self, state):
+        """
+                Go back to a state from getstate.
+
+                Parameters: state (int) : Number of draws
+                Returns: N/A
+        """
+        self.counter = state
+
+
+class Snapshot:
+    """
+            What changes in a GameState between rounds: heroes' positions, counters, outcome and the random
+            generator's state. Dots are not copied, the state's log of eaten dots is cut back to its length at
+            snapshot time instead, so taking and restoring a snapshot does not depend on the board size.
+    """
+
+    __slots__ = ("pacman_position", "ghosts_positions", "dots_counter", "ghost_3", "rounds", "outcome", "rng_state",
+                 "eaten")
+
+    def __init__(self, pacman_position, ghosts_positions, dots_counter, ghost_3, rounds, outcome, rng_state, eaten):
+        self.pacman_position = pacman_position
+        self.ghosts_positions = ghosts_positions
+        self.dots_counter = dots_counter
+        self.ghost_3 = ghost_3
+        self.rounds = rounds
+        self.outcome = outcome
+        self.rng_state = rng_state
+        self.eaten = eaten
+
+
+class GameState:
+    """
+            State of a single headless game. Uses the same rules as main() but does no I/O and never
+            mutates the board, which is only used to look up walls.
+
+            Parameters: board (Board) : Game board from read_board
+                        seed (int) : Seed of the game's random generator
+                        max_rounds (int) : Number of rounds after which the game ends with a timeout
+                        ghosts (int) : Number of Ghosts to keep from the board (all of them by default)
+                        next_hops (NextHops) : Shortest path table for Ghosts chasing along the maze (optional)
+                        rng (random.Random) : Random generator to use instead of random.Random(seed), e.g.
+                                              CounterRandom(seed) to match the NumPy batch engine
+                        entities (Entities) : Starting positions found once for the board, saves scanning the
+                                              board for every game (optional)
+                        strategies (list) : Names of the Ghosts' strategies from ghosts.STRATEGIES, repeated when
+                                            shorter than the number of Ghosts (the board file's or
+                                            ghosts.DEFAULT_STRATEGIES by default)
+    """
+
+    def __init__(self, board, seed=None, max_rounds=1000, ghosts=None, next_hops=None, rng=None, entities=None,
+                 strategies=None):
+        self.board = board
+        self.next_hops = next_hops
+        self.rng = rng if rng is not None else random.Random(seed)
+        self.max_rounds = max_rounds
+        entities = entities.copy(ghosts) if entities is not None else Entities.from_board(board).copy(ghosts)
+        self.pacman_position = entities.pacman
+        self.ghosts_positions = entities.ghosts
+        self.strategies = None
+        if strategies or board.ghost_strategies:
+            self.strategies = make_strategies(board, strategies, len(self.ghosts_positions))
+        self.dots = board.tiles.translate(DOTS_MASK)
+        self.dots_counter = board.tiles.count(DOT)
+        self.dots_total = self.dots_counter
+        self.ghost_3 = "ghost_1"
+        self.rounds = 0
+        self.outcome = None
+        # Flat indexes of eaten dots in eating order, so restore() can put back the dots eaten after a snapshot
+        self.eaten = []
+
+    def step(self, action):
+        """
+                Play one round: move Pacman in the chosen direction, then move the Ghosts.
+
+                Parameters: action (str) : One of "w", "s", "a", "d", None to stay in place
+                Returns: outcome (str) : VICTORY, DEFEAT, TIMEOUT or None if the game goes on.
+        """
+        if self.outcome is not None:
+            return self.outcome
+        self.rounds += 1
+        pacman_position = move_hero(self.board, self.pacman_position, action)
+        self.pacman_position = pacman_position
+        index = pacman_position[0] * self.board.width + pacman_position[1]
+        if self.dots[index]:
+            self.dots[index] = 0
+            self.dots_counter -= 1
+            self.eaten.append(index)
+
+        # Check if game ends after Pacman's move
+        if self.dots_counter == 0:
+            self.outcome = VICTORY
+        elif pacman_position in self.ghosts_positions:
+            self.outcome = DEFEAT
+        if self.outcome is not None:
+            return self.outcome
+
+        # Ghosts move
+        self.ghosts_positions = move_ghosts(self.board, self.ghosts_positions, pacman_position, self.ghost_3,
+                                            self.rng, self.next_hops, self.strategies)
+        self.ghost_3 = change_ghost_3(self.ghost_3)
+        if pacman_position in self.ghosts_positions:
+            self.outcome = DEFEAT
+        elif self.rounds >= self.max_rounds:
+            self.outcome = TIMEOUT
+        return self.outcome
+
+    def legal_moves(self):
+        """
+                List Pacman's moves that do not hit a wall.
+
+                Parameters: N/A
+                Returns: moves (list) : Subset of ACTIONS
+        """
+        return LEGAL_ACTIONS[self.board.moves[self.board.index(self.pacman_position[0], self.pacman_position[1])]]
+
+    def legal_actions(self):
+        """
+                Actions worth searching from the current state: Pacman's moves that do not hit a wall, or staying
+                in place (None) when Pacman is boxed in.
+
+                Parameters: N/A
+                Returns: actions (list) : Actions to pass to apply() or step()
+        """
+        return self.legal_moves() or [None]
+
+    def snapshot(self):
+        """
+                Save the state to come back to it later. Costs O(number of Ghosts), plus the random generator's
+                state, which is a single counter for CounterRandom.
+
+                Parameters: N/A
+                Returns: snapshot (Snapshot) : Saved state for restore()
+        """
+        return Snapshot(self.pacman_position, list(self.ghosts_positions), self.dots_counter, self.ghost_3,
+                        self.rounds, self.outcome, self.rng.getstate(), len(self.eaten))
+
+    def restore(self, snapshot, rng=True):
+        """
+                Go back to a saved state. Dots eaten since the snapshot are put back, so it costs O(number of
+                Ghosts + dots eaten since the snapshot).
+
+                Parameters: snapshot (Snapshot) : State from snapshot() or apply(), taken later than any snapshot
+                                                  already restored past
+                            rng (bool) : Restore the random generator too, False to let the next rounds draw new
+                                         numbers, e.g. for Monte Carlo rollouts
+                Returns: N/A
+        """
+        eaten = self.eaten
+        dots = self.dots
+        while len(eaten) > snapshot.eaten:
+            dots[eaten.pop()] = 1
+        self.pacman_position = snapshot.pacman_position
+        self.ghosts_positions = list(snapshot.ghosts_positions)
+        self.dots_counter = snapshot.dots_counter
+        self.ghost_3 = snapshot.ghost_3
+        self.rounds = snapshot.rounds
+        self.outcome = snapshot.outcome
+        if rng:
+            self.rng.setstate(snapshot.rng_state)
+
+    def apply(self, action):
+        """
+                Play one round for search code: like step(), but returns what is needed to undo the round.
+
+                Parameters: action (str) : One of legal_actions()
+                Returns: snapshot (Snapshot) : State before the round, to pass to restore()
+        """
+        snapshot = self.snapshot()
+        self.step(action)
+        return snapshot
+
+    def stats(self):
+        """
+                Summarise the game.
+
+                Parameters: N/A
+                Returns: stats (dict) : Outcome, rounds played and dots eaten.
+        """
+        return {
+            "outcome": self.outcome,
+            "rounds": self.rounds,
+            "dots_eaten": self.dots_total - self.dots_counter,
+            "dots_left": self.dots_counter,
+        }
+
+
+def random_policy(state):
+    """
+            Pacman policy choosing a random legal move.
+
+            Parameters: state (GameState) : Current game state
+            Returns: action (str) : Chosen move
+    """
+    moves = state.legal_moves()
+    return state.rng.choice(moves) if moves else ACTIONS[0]
+
+
+def dot_seeking_policy(state):
+    """
+            Pacman policy preferring moves onto a dot, random legal move otherwise.
+
+            Parameters: state (GameState) : Current game state
+            Returns: action (str) : Chosen move
+    """
+    board = state.board
+    index = state.pacman_position[0] * board.width + state.pacman_position[1]
+    offsets = board.offsets
+    dots = state.dots
+    moves = MOVES[board.moves[index]]
+    if not moves:
+        return ACTIONS[0]
+    with_dots = [direction for direction in moves if dots[index + offsets[direction]]]
+    return ACTIONS[state.rng.choice(with_dots or moves)]
+
+
+def run_game(board, policy=dot_seeking_policy, seed=None, max_rounds=1000, ghosts=None, next_hops=None,
+             replay_path=None, entities=None, strategies=None):
+    """
+            Play one headless game until it ends.
+
+            Parameters: board (Board) : Game board from read_board
+                        policy (function) : Function taking a GameState and returning Pacman's move
+                        seed (int) : Seed of the game's random generator
+                        max_rounds (int) : Number of rounds after which the game ends with a timeout
+                        ghosts (int) : Number of Ghosts to keep from the board (all of them by default)
+                        next_hops (NextHops) : Shortest path table for Ghosts chasing along the maze (optional)
+                        replay_path (str) : File to write a binary replay of the game to (optional)
+                        entities (Entities) : Starting positions from Entities.from_board (optional)
+                        strategies (list) : Names of the Ghosts' strategies, see GameState
+            Returns: stats (dict) : Final outcome and statistics of the game.
+    """
+    state = GameState(board, seed, max_rounds, ghosts, next_hops, entities=entities, strategies=strategies)
+    step = state.step
+    if replay_path is None:
+        while step(policy(state)) is None:
+            pass
+    else:
+        from replay import ReplayRecorder
+        recorder = ReplayRecorder(state, seed)
+        while step(policy(state)) is None:
+            recorder.record(state)
+        recorder.record(state)
+        recorder.save(replay_path, state.outcome)
+    result = state.stats()
+    result["seed"] = seed
+    return result
+
+
+def run_batch(board, games, policy=dot_seeking_policy, seed=0, max_rounds=1000, next_hops=None, strategies=None):
+    """
+            Play a batch of seeded headless games. Game number i uses seed + i.
+
+            Parameters: board (Board) : Game board from read_board
+                        games (int) : Number of games to play
+                        policy (function) : Function taking a GameState and returning Pacman's move
+                        seed (int) : Seed of the first game
+                        max_rounds (int) : Number of rounds after which a game ends with a timeout
+                        next_hops (NextHops) : Shortest path table for Ghosts chasing along the maze (optional)
+                        strategies (list) : Names of the Ghosts' strategies, see GameState
+            Returns: summary (dict) : Outcome counts, rounds played and throughput of the batch.
+    """
+    summary = {VICTORY: 0, DEFEAT: 0, TIMEOUT: 0, "games": games, "steps": 0}
+    start = time.perf_counter()
+    entities = Entities.from_board(board)
+    for game in range(games):
+        result = run_game(board, policy, seed + game, max_rounds, next_hops=next_hops, entities=entities,
+                          strategies=strategies)
+        summary[result["outcome"]] += 1
+        summary["steps"] += result["rounds"]
+    summary["seconds"] = time.perf_counter() - start
+    summary["steps_per_second"] = summary["steps"] / summary["seconds"] if summary["seconds"] else 0.0
+    summary["average_rounds"] = summary["steps"] / games if games else 0.0
+    return summary
+
+
+def update_view(view, state, last_positions):
+    """
+            Move heroes on a copy of the game's board after a round.
+
+            Parameters: view (Board) : Copy of the game's board used for drawing
+                        state (GameState) : Game state after the round
+                        last_positions (list) : Positions of Pacman and Ghosts before the round
+            Returns: view (Board) : Updated copy of the board
+    """
+    return draw_heroes(view, state.dots, state.pacman_position, state.ghosts_positions, last_positions)
+
+
+def watch_game(board, policy=dot_seeking_policy, seed=None, max_rounds=1000, renderer=None, max_fps=10):
+    """
+            Play one headless game and draw it. The game's board is never written, a copy of it shows Pacman, Ghosts
+            and remaining dots, so only places of moved heroes change between frames.
+
+            Parameters: board (Board) : Game board from read_board
+                        policy (function) : Function taking a GameState and returning Pacman's move
+                        seed (int) : Seed of the game's random generator
+                        max_rounds (int) : Number of rounds after which the game ends with a timeout
+                        renderer (AnsiRenderer) : Renderer to draw with (ANSI or plain renderer on stdout by default)
+                        max_fps (float) : Maximum number of frames per second of the default renderer
+            Returns: stats (dict) : Final outcome and statistics of the game.
+    """
+    renderer = renderer or make_renderer(max_fps=max_fps)
+    state = GameState(board, seed, max_rounds)
+    view = board.copy()
+    renderer.draw(view)
+    while state.outcome is None:
+        last_positions = [state.pacman_position] + state.ghosts_positions
+        state.step(policy(state))
+        update_view(view, state, last_positions)
+        renderer.draw(view, force=state.outcome is not None)
+    renderer.close()
+    result = state.stats()
+    result["seed"] = seed
+    return result
+
+
+POLICIES = {
+    "random": random_policy,
+    "dots": dot_seeking_policy,
+}
+
+
+if __name__ == "__main__":
+    print(run_batch(read_board("pacman_board.txt"), 1000))
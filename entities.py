@@ -0,0 +1,106 @@
+from collections import Counter
+
+from board import GHOST, PACMAN
+
+
+def locate(board, tile):
+    """
+            Find every place holding a tile, scanning the board once.
+
+            Parameters: board (Board) : Game board
+                        tile (int) : Tile character code, e.g. PACMAN or GHOST
+            Returns: positions (list) : [row, col] of every match in reading order
+    """
+    positions = []
+    index = board.tiles.find(tile)
+    while index >= 0:
+        positions.append(list(divmod(index, board.width)))
+        index = board.tiles.find(tile, index + 1)
+    return positions
+
+
+class Entities:
+    """
+            Registry of Pacman's and the Ghosts' positions. It is filled by scanning the board once at load time and
+            then holds the authoritative positions, so the board never has to be searched again. The optional
+            occupancy index counts Ghosts per place for O(1) collision checks whatever the number of Ghosts.
+
+            Parameters: pacman (list) : Pacman's position
+                        ghosts (list) : Ghosts' positions
+                        width (int) : Board width, needed by the occupancy index
+                        track_occupancy (bool) : Keep the occupancy index up to date
+    """
+
+    __slots__ = ("pacman", "ghosts", "width", "occupancy")
+
+    def __init__(self, pacman, ghosts, width, track_occupancy=False):
+        self.pacman = pacman
+        self.ghosts = ghosts
+        self.width = width
+        self.occupancy = None
+        if track_occupancy:
+            self.occupancy = Counter(row * width + col for row, col in ghosts)
+
+    @classmethod
+    def from_board(cls, board, track_occupancy=False):
+        """
+                Locate Pacman (G) and the Ghosts (X) on a board.
+
+                Parameters: board (Board) : Game board
+                            track_occupancy (bool) : Keep the occupancy index up to date
+                Returns: entities (Entities) : Registry of the heroes' positions
+        """
+        pacman = locate(board, PACMAN)
+        if not pacman:
+            raise ValueError("There is no Pacman (G) on the board")
+        return cls(pacman[0], locate(board, GHOST), board.width, track_occupancy)
+
+    def copy(self, ghosts=None):
+        """
+                Independent copy of the registry.
+
+                Parameters: ghosts (int) : Number of Ghosts to keep (all of them by default)
+                Returns: entities (Entities) : Copy of the registry
+        """
+        return Entities(list(self.pacman), [list(ghost) for ghost in self.ghosts[:ghosts]], self.width,
+                        self.occupancy is not None)
+
+    def move_pacman(self, new_pacman_position):
+        """
+                Record Pacman's move.
+
+                Parameters: new_pacman_position (list) : Pacman's position after its move
+                Returns: N/A
+        """
+        self.pacman = new_pacman_position
+
+    def move_ghosts(self, new_ghosts_positions):
+        """
+                Record the Ghosts' moves.
+
+                Parameters: new_ghosts_positions (list) : Ghosts' positions after their moves
+                Returns: N/A
+        """
+        if self.occupancy is not None:
+            width = self.width
+            occupancy = self.occupancy
+            for (last_row, last_col), (new_row, new_col) in zip(self.ghosts, new_ghosts_positions):
+                last_index = last_row * width + last_col
+                new_index = new_row * width + new_col
+                if last_index != new_index:
+                    occupancy[last_index] -= 1
+                    if not occupancy[last_index]:
+                        del occupancy[last_index]
+                    occupancy[new_index] += 1
+        self.ghosts = new_ghosts_positions
+
+    def has_ghost(self, position):
+        """
+                Check if a Ghost stands on a place.
+
+                Parameters: position (list) : Place on the board
+                Returns: True/ False (bool) : Boolean value defining if there is a Ghost on the place.
+        """
+        if self.occupancy is not None:
+            return position[0] * self.width + position[1] in self.occupancy
+        return position in self.ghosts
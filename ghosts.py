@@ -0,0 +1,139 @@
+import random
+
+from main import move_ghost_1, move_ghost_2, count_distances_to_pacman, go
+
+# Strategies of Ghosts 1, 2 and 3 in the original game, repeated when a board has more Ghosts
+DEFAULT_STRATEGIES = ("random", "shortest", "alternating")
+
+
+class RandomGhost:
+    """
+            Ghost moving to a random neighbouring place, like Ghost 1.
+    """
+
+    name = "random"
+    __slots__ = ()
+
+    def move(self, board, ghost_position, pacman_position, ghost_3, rng=random, next_hops=None):
+        """
+                Move the Ghost.
+
+                Parameters: board (Board) : Game board
+                            ghost_position (list) : Current Ghost's position on the board.
+                            pacman_position (list) : Current Pacman's position on the board.
+                            ghost_3 (str) : Attribute to define the move of alternating Ghosts.
+                            rng (random.Random) : Source of randomness (module random by default).
+                            next_hops (NextHops) : Shortest path table (optional).
+                Returns: new_ghost_position (list) : Ghost's position after its move.
+        """
+        return move_ghost_1(board, ghost_position, rng)
+
+
+class GreedyGhost(RandomGhost):
+    """
+            Ghost chasing Pacman in a straight line, even when a shortest path table is loaded.
+    """
+
+    name = "greedy"
+    __slots__ = ()
+
+    def move(self, board, ghost_position, pacman_position, ghost_3, rng=random, next_hops=None):
+        return move_ghost_2(board, ghost_position, pacman_position)
+
+
+class ShortestPathGhost(RandomGhost):
+    """
+            Ghost chasing Pacman along the maze when a shortest path table is loaded and in a straight line
+            otherwise, like Ghost 2.
+    """
+
+    name = "shortest"
+    __slots__ = ()
+
+    def move(self, board, ghost_position, pacman_position, ghost_3, rng=random, next_hops=None):
+        return move_ghost_2(board, ghost_position, pacman_position, next_hops)
+
+
+class AlternatingGhost(RandomGhost):
+    """
+            Ghost moving randomly and chasing Pacman in turns, like Ghost 3. All alternating Ghosts share the turn
+            given by ghost_3.
+    """
+
+    name = "alternating"
+    __slots__ = ()
+
+    def move(self, board, ghost_position, pacman_position, ghost_3, rng=random, next_hops=None):
+        if ghost_3 == "ghost_1":
+            return move_ghost_1(board, ghost_position, rng)
+        return move_ghost_2(board, ghost_position, pacman_position, next_hops)
+
+
+class ScatterGhost(RandomGhost):
+    """
+            Ghost ignoring Pacman and heading in a straight line for its home corner, then circling around it.
+
+            Parameters: home (list) : Place the Ghost heads for, usually a corner of the board
+    """
+
+    name = "scatter"
+    __slots__ = ("home",)
+
+    def __init__(self, home):
+        self.home = home
+
+    def move(self, board, ghost_position, pacman_position, ghost_3, rng=random, next_hops=None):
+        direction = count_distances_to_pacman(board, ghost_position, self.home)
+        if direction is None:
+            return ghost_position
+        return go(ghost_position, direction)
+
+
+STRATEGIES = {strategy.name: strategy for strategy in (RandomGhost, GreedyGhost, ShortestPathGhost,
+                                                        AlternatingGhost, ScatterGhost)}
+
+
+def parse_strategies(text):
+    """
+            Split a list of strategy names such as "random, shortest scatter".
+
+            Parameters: text (str) : Names separated by commas and/ or spaces
+            Returns: names (list) : Strategy names
+    """
+    names = text.replace(",", " ").split()
+    for name in names:
+        if name not in STRATEGIES:
+            raise ValueError(f"Unknown ghost strategy: {name} (expected one of {', '.join(STRATEGIES)})")
+    return names
+
+
+def make_strategies(board, names=None, ghosts=0):
+    """
+            Build one strategy per Ghost. Names are repeated when there are fewer of them than Ghosts, and
+            scatter Ghosts get the four corners of the board in turn as their homes.
+
+            Parameters: board (Board) : Game board
+                        names (list) : Strategy names (the board file's, or DEFAULT_STRATEGIES, by default)
+                        ghosts (int) : Number of Ghosts
+            Returns: strategies (list) : One strategy per Ghost, to pass to main.move_ghosts
+    """
+    if isinstance(names, str):
+        names = parse_strategies(names)
+    names = names or board.ghost_strategies or DEFAULT_STRATEGIES
+    corners = ([0, 0], [0, board.width - 1], [board.height - 1, 0], [board.height - 1, board.width - 1])
+    # Strategies other than scatter hold no state, so all Ghosts with the same strategy share one object
+    shared = {}
+    scatter_ghosts = 0
+    strategies = []
+    for ghost in range(ghosts):
+        name = names[ghost % len(names)]
+        if name not in STRATEGIES:
+            raise ValueError(f"Unknown ghost strategy: {name} (expected one of {', '.join(STRATEGIES)})")
+        if name == ScatterGhost.name:
+            strategies.append(ScatterGhost(corners[scatter_ghosts % len(corners)]))
+            scatter_ghosts += 1
+        else:
+            if name not in shared:
+                shared[name] = STRATEGIES[name]()
+            strategies.append(shared[name])
+    return strategies
@@ -0,0 +1,191 @@
+import mmap
+import os
+import struct
+from array import array
+
+from board import Board, WALL, DOT, EMPTY, PACMAN, GHOST
+from entities import Entities
+
+# Board file line assigning strategies to the Ghosts
+GHOSTS_DIRECTIVE = "ghosts:"
+LEGAL_TILES = bytes([WALL, DOT, EMPTY, PACMAN, GHOST])
+
+# Compiled board: magic, version, width, height, size and modification time of the text file it was compiled
+# from, dots, Pacman's flat index (-1 if there is none), number of Ghosts, length of the strategies line.
+# It is followed by the Ghosts' flat indexes (uint32), the strategies line, the tiles and the neighbour table.
+CACHE_HEADER = struct.Struct("<6sHIIQqIiIH")
+CACHE_MAGIC = b"PBOARD"
+CACHE_VERSION = 1
+CACHE_SUFFIX = ".pboard"
+
+
+def cache_path(text_file):
+    """
+            Compiled board file next to a text board, e.g. maze.pboard for maze.txt.
+
+            Parameters: text_file (str) : Text file with game board
+            Returns: path (str) : Path of the compiled board
+    """
+    return os.path.splitext(text_file)[0] + CACHE_SUFFIX
+
+
+def parse_board(data):
+    """
+            Parse a text board in a single pass over its rows: check that rows are rectangular and hold only
+            legal tiles, count the dots and locate Pacman and the Ghosts while copying the rows into the tile
+            buffer. Trailing empty lines are ignored and a "ghosts: ..." line assigns the Ghosts' strategies.
+
+            Parameters: data (bytes/ mmap) : Content of the board file
+            Returns: board (Board) : Game board
+                     entities (Entities) : Positions of Pacman (None if there is none) and the Ghosts
+                     dots (int) : Number of dots on the board
+    """
+    directive = GHOSTS_DIRECTIVE.encode("ascii")
+    tiles = bytearray()
+    width = None
+    height = 0
+    empty_rows = 0
+    dots = 0
+    pacman = None
+    ghosts = []
+    strategies = None
+    start = 0
+    end = len(data)
+    while start < end:
+        stop = data.find(b"\n", start)
+        if stop < 0:
+            stop = end
+        row = data[start:stop]
+        start = stop + 1
+        if row.endswith(b"\r"):
+            row = row[:-1]
+        if row.startswith(directive):
+            strategies = row[len(directive):].decode("ascii").replace(",", " ").split()
+            continue
+        if not row:
+            empty_rows += 1
+            continue
+        if width is None:
+            width = len(row)
+        if empty_rows:
+            raise ValueError(f"Row {height} has 0 tiles, expected {width}")
+        if len(row) != width:
+            raise ValueError(f"Row {height} has {len(row)} tiles, expected {width}")
+        illegal = row.translate(None, LEGAL_TILES)
+        if illegal:
+            raise ValueError(f"Row {height} has an illegal tile {chr(illegal[0])!r} at column "
+                             f"{row.index(illegal[:1])}")
+        dots += row.count(DOT)
+        if pacman is None:
+            col = row.find(PACMAN)
+            if col >= 0:
+                pacman = [height, col]
+        col = row.find(GHOST)
+        while col >= 0:
+            ghosts.append([height, col])
+            col = row.find(GHOST, col + 1)
+        tiles += row
+        height += 1
+    board = Board(width or 0, height, tiles)
+    board.ghost_strategies = strategies
+    return board, Entities(pacman, ghosts, board.width), dots
+
+
+def save_compiled_board(path, board, entities, dots, source_size=0, source_mtime=0):
+    """
+            Save a compiled board. The file is written next to the final one and renamed, so readers never
+            see a partial file.
+
+            Parameters: path (str) : Compiled board file to write
+                        board (Board) : Game board
+                        entities (Entities) : Positions of Pacman and the Ghosts
+                        dots (int) : Number of dots on the board
+                        source_size, source_mtime (int) : Size and modification time (ns) of the text file
+            Returns: N/A
+    """
+    width = board.width
+    pacman = -1 if entities.pacman is None else entities.pacman[0] * width + entities.pacman[1]
+    strategies = " ".join(board.ghost_strategies or ()).encode("ascii")
+    header = CACHE_HEADER.pack(CACHE_MAGIC, CACHE_VERSION, width, board.height, source_size, source_mtime, dots,
+                               pacman, len(entities.ghosts), len(strategies))
+    temporary_file = f"{path}.{os.getpid()}.tmp"
+    with open(temporary_file, "wb") as compiled:
+        compiled.write(header)
+        compiled.write(array("I", [row * width + col for row, col in entities.ghosts]).tobytes())
+        compiled.write(strategies)
+        compiled.write(board.tiles)
+        compiled.write(board.moves)
+    os.replace(temporary_file, path)
+
+
+def load_compiled_board(path, source_size=None, source_mtime=None):
+    """
+            Load a compiled board.
+
+            Parameters: path (str) : Compiled board file
+                        source_size, source_mtime (int) : Size and modification time (ns) the text file must still
+                                                          have, None to skip the check
+            Returns: board (Board) : Game board, None if the file is missing, stale or damaged
+                     entities (Entities) : Positions of Pacman (None if there is none) and the Ghosts
+                     dots (int) : Number of dots on the board
+    """
+    try:
+        with open(path, "rb") as compiled:
+            data = compiled.read()
+    except OSError:
+        return None, None, 0
+    if len(data) < CACHE_HEADER.size:
+        return None, None, 0
+    (magic, version, width, height, size, mtime, dots, pacman, ghosts_count,
+     strategies_length) = CACHE_HEADER.unpack_from(data)
+    if magic != CACHE_MAGIC or version != CACHE_VERSION:
+        return None, None, 0
+    if source_size is not None and (size, mtime) != (source_size, source_mtime):
+        return None, None, 0
+    places = width * height
+    offset = CACHE_HEADER.size
+    if len(data) != offset + 4 * ghosts_count + strategies_length + 2 * places:
+        return None, None, 0
+    ghosts = array("I")
+    ghosts.frombytes(data[offset:offset + 4 * ghosts_count])
+    offset += 4 * ghosts_count
+    strategies = data[offset:offset + strategies_length].decode("ascii").split()
+    offset += strategies_length
+    # Slices of a memoryview do not copy, so tiles and the neighbour table are copied once, into the board
+    view = memoryview(data)
+    board = Board(width, height, view[offset:offset + places], view[offset + places:offset + 2 * places])
+    board.ghost_strategies = strategies or None
+    entities = Entities(None if pacman < 0 else list(divmod(pacman, width)),
+                        [list(divmod(index, width)) for index in ghosts], width)
+    return board, entities, dots
+
+
+def load_board(text_file, cache=True):
+    """
+            Load a text board through a memory map, without holding its text as Python strings, and keep a
+            compiled copy next to it. Later loads of an unchanged file read the compiled copy instead, which
+            skips parsing and rebuilding the neighbour table.
+
+            Parameters: text_file (str) : Text file with game board
+                        cache (bool) : Use and write the compiled board (text_file with .pboard suffix)
+            Returns: board (Board) : Game board
+                     entities (Entities) : Positions of Pacman (None if there is none) and the Ghosts
+                     dots (int) : Number of dots on the board
+    """
+    stat = os.stat(text_file)
+    if cache:
+        board, entities, dots = load_compiled_board(cache_path(text_file), stat.st_size, stat.st_mtime_ns)
+        if board is not None:
+            return board, entities, dots
+    if stat.st_size:
+        with open(text_file, "rb") as board_file, \
+                mmap.mmap(board_file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            board, entities, dots = parse_board(data)
+    else:
+        board, entities, dots = parse_board(b"")
+    if cache:
+        try:
+            save_compiled_board(cache_path(text_file), board, entities, dots, stat.st_size, stat.st_mtime_ns)
+        except OSError:
+            pass
+    return board, entities, dots
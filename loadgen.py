@@ -0,0 +1,192 @@
+import argparse
+import asyncio
+import json
+import random
+import time
+from array import array
+
+from board import WALL, PACMAN
+from server import GameServer, DEFAULT_PORT
+from telemetry import percentile, PERCENTILES
+
+ACTIONS = ("w", "s", "a", "d")
+
+
+class ClientBoard:
+    """
+            Board as seen by a client: the tiles from the BOARD message, kept up to date with the changed places
+            of every TICK message.
+
+            Parameters: width, height (int) : Size of the board
+                        tiles (bytearray) : Tiles, row after row
+    """
+
+    __slots__ = ("width", "height", "tiles", "pacman")
+
+    def __init__(self, width, height, tiles):
+        self.width = width
+        self.height = height
+        self.tiles = tiles
+        self.pacman = tiles.find(PACMAN)
+
+    def apply(self, cells):
+        """
+                Write the changed places of a TICK message.
+
+                Parameters: cells (str) : "<flat index>:<tile>" items separated by commas
+                Returns: N/A
+        """
+        if not cells:
+            return
+        tiles = self.tiles
+        for cell in cells.split(","):
+            index, tile = cell.split(":")
+            index = int(index)
+            tiles[index] = ord(tile)
+            if tiles[index] == PACMAN:
+                self.pacman = index
+
+    def legal_actions(self):
+        """
+                Pacman's moves that do not hit a wall.
+
+                Parameters: N/A
+                Returns: actions (list) : Subset of ACTIONS, all of them if Pacman is not on the board
+        """
+        if self.pacman < 0:
+            return list(ACTIONS)
+        tiles = self.tiles
+        offsets = (-self.width, self.width, -1, 1)
+        return [action for action, offset in zip(ACTIONS, offsets) if tiles[self.pacman + offset] != WALL]
+
+
+async def play_session(host, port, rng, latencies, seed=None):
+    """
+            Play one game on the server with random legal moves, timing every move's round trip.
+
+            Parameters: host (str) : Server address
+                        port (int) : Server port
+                        rng (random.Random) : Random generator choosing the moves
+                        latencies (array) : Round trip times in seconds, appended to
+                        seed (int) : Seed of the game (the server picks one by default)
+            Returns: report (dict) : Session report sent by the server, None if the connection closed early
+    """
+    reader, writer = await asyncio.open_connection(host, port, limit=2 ** 16)
+    try:
+        writer.write(b"PLAY\n" if seed is None else f"PLAY {seed}\n".encode("ascii"))
+        _, width, height = (await reader.readline()).split()
+        width, height = int(width), int(height)
+        rows = [await reader.readline() for _ in range(height)]
+        board = ClientBoard(width, height, bytearray(b"".join(row[:width] for row in rows)))
+        outcome = "-"
+        while outcome == "-":
+            writer.write(rng.choice(board.legal_actions()).encode("ascii") + b"\n")
+            sent = time.perf_counter()
+            line = await reader.readline()
+            latencies.append(time.perf_counter() - sent)
+            if not line.startswith(b"TICK"):
+                return None
+            _, _, _, outcome, cells = line.decode("ascii").rstrip("\n").split(" ", 4)
+            board.apply(cells)
+        line = await reader.readline()
+        return json.loads(line[len(b"SESSION "):]) if line.startswith(b"SESSION") else None
+    finally:
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except ConnectionError:
+            pass
+
+
+async def run_load(host="127.0.0.1", port=DEFAULT_PORT, sessions=1000, concurrency=100, seed=0):
+    """
+            Play many games on a server at once and measure its capacity. Every client plays a whole game with
+            random legal moves and sends a move as soon as it gets the answer to the previous one.
+
+            Parameters: host (str) : Server address
+                        port (int) : Server port
+                        sessions (int) : Number of games to play
+                        concurrency (int) : Number of games played at the same time
+                        seed (int) : Seed of the first game, game i uses seed + i
+            Returns: report (dict) : Sessions and moves per second, outcomes, round trip latency percentiles in
+                                     milliseconds and server tick latency of the sessions
+    """
+    latencies = array("d")
+    session_ticks = array("d")
+    outcomes = {}
+    failures = 0
+    next_session = 0
+
+    async def client():
+        nonlocal next_session, failures
+        while next_session < sessions:
+            game = next_session
+            next_session += 1
+            try:
+                report = await play_session(host, port, random.Random(seed + game), latencies, seed + game)
+            except (ConnectionError, OSError, ValueError):
+                report = None
+            if report is None:
+                failures += 1
+                continue
+            outcomes[report["outcome"]] = outcomes.get(report["outcome"], 0) + 1
+            session_ticks.append(report["mean_tick_ms"])
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(min(concurrency, sessions))))
+    seconds = time.perf_counter() - started
+    ordered = sorted(latencies)
+    report = {
+        "sessions": sessions,
+        "concurrency": concurrency,
+        "failures": failures,
+        "outcomes": outcomes,
+        "seconds": seconds,
+        "sessions_per_second": (sessions - failures) / seconds if seconds else 0.0,
+        "moves": len(ordered),
+        "moves_per_second": len(ordered) / seconds if seconds else 0.0,
+        "max_round_trip_ms": ordered[-1] * 1000 if ordered else 0.0,
+    }
+    for percent in PERCENTILES:
+        report[f"round_trip_p{percent}_ms"] = percentile(ordered, percent) * 1000
+    ordered = sorted(session_ticks)
+    for percent in PERCENTILES:
+        report[f"session_mean_tick_p{percent}_ms"] = percentile(ordered, percent)
+    return report
+
+
+async def run_local(board_file, sessions, concurrency, seed, max_rounds):
+    """
+            Start a server in this process on a free port and run the load against it. Server and clients
+            share one event loop, so latencies include the clients' work.
+
+            Parameters: board_file (str) : Text file with game board
+                        sessions, concurrency, seed : See run_load
+                        max_rounds (int) : Number of rounds after which a game ends with a timeout
+            Returns: report (dict) : Load report with the server's statistics under "server"
+    """
+    from engine import read_board
+    game_server = GameServer(read_board(board_file), seed, max_rounds)
+    server = await game_server.start("127.0.0.1", 0)
+    async with server:
+        report = await run_load("127.0.0.1", server.sockets[0].getsockname()[1], sessions, concurrency, seed)
+    report["server"] = game_server.report()
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test a Pacman game server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--sessions", type=int, default=1000, help="number of games to play")
+    parser.add_argument("--concurrency", type=int, default=100, help="number of games played at the same time")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--local", nargs="?", const="pacman_board.txt", default=None, metavar="BOARD",
+                        help="start a server with BOARD in this process instead of connecting to one")
+    parser.add_argument("--max-rounds", type=int, default=1000, help="round limit of the --local server")
+    args = parser.parse_args()
+    if args.local:
+        load_report = asyncio.run(run_local(args.local, args.sessions, args.concurrency, args.seed, args.max_rounds))
+    else:
+        load_report = asyncio.run(run_load(args.host, args.port, args.sessions, args.concurrency, args.seed))
+    print(json.dumps(load_report, indent=2))
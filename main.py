@@ -1,21 +1,28 @@
 import random
 import math
-import copy
+
+from board import WALL, PACMAN, GHOST, MOVES, DotLayer
+from entities import Entities, locate
+from loader import load_board
+from render import make_renderer
+from telemetry import NullTelemetry, make_telemetry
+
+MOVE_OPTIONS = "wsad"
+NULL_TELEMETRY = NullTelemetry()
+# Row and column change when moving up, down, left and right
+STEPS = ((-1, 0), (1, 0), (0, -1), (0, 1))
 
 
 def read_board(text_file):
     """
-            Read game board from text file and remove special characters to display it later.
+            Read game board from text file, checking its rows and tiles. A line "ghosts: random shortest ..."
+            below the board assigns strategies to the Ghosts in reading order. A compiled copy of the board is
+            kept next to the text file to load it faster next time (see loader.load_board).
 
             Parameters: text_file (str) : Text file with game board in a format name.txt
-            Returns: board (list) : Game board
-    """
-    with open(text_file, "r") as pacman_board:
-        board_file = pacman_board.readlines()
-    board = []
-    for row in board_file:
-        row = row.replace("\n", "")
-        board.append(list(row))
+            Returns: board (Board) : Game board
+    """
+    board, _, _ = load_board(text_file)
     return board
 
 
@@ -23,107 +30,56 @@ def display_board(board):
     """
             Display game board
 
-            Parameters: board (list) : Game board
+            Parameters: board (Board) : Game board
             Returns: N/A
     """
-    for row in enumerate(board):
-        for col in enumerate(board):
-            board[row[0]][col[0]] = str(board[row[0]][col[0]])
-    for row in enumerate(board):
-        print("".join(board[row[0]]))
-
-
-def update_board_pacman(board, last_pacman_position, new_pacman_position):
-    """
-            Update Pacman position on board after its move.
-
-            Parameters: board (list) : Game board
-                        last_pacman_position (list) : Previous position of Pacman on the board
-                        new_pacman_position (list) : Current position of Pacman after its move
-            Returns: board (list) : Game board after Pacman's move
-    """
-    board[last_pacman_position[0]][last_pacman_position[1]] = " "
-    board[new_pacman_position[0]][new_pacman_position[1]] = "G"
-    return board
-
-
-def get_next_place_in_board(board, log_board, new_ghosts_positions, last_ghosts_positions):
-    """
-            Return characters on positions to which ghosts are moving. Needed for game board update.
-
-            Parameters: board (list) : Game board
-                        log_board (list) : List of booleans marking if Pacman has visited chosen place in a game board
-                        new_ghosts_positions (list) : New positions of Ghosts after their moves
-                        last_ghosts_positions (list) : Last positions of Ghosts
-            Returns: next_places (list) : List characters on positions to which ghosts are moving.
-    """
-    next_places = []
-    for i in range(0, len(new_ghosts_positions)):
-        if board[new_ghosts_positions[i][0]][new_ghosts_positions[i][1]] == "G":
-            next_places.append(" ")
-        elif board[new_ghosts_positions[i][0]][new_ghosts_positions[i][1]] == "X":
-            if log_board[last_ghosts_positions[i][0]][last_ghosts_positions[i][1]]:
-                next_places.append(" ")
-            else:
-                next_places.append(".")
-        else:
-            next_places.append(board[new_ghosts_positions[i][0]][new_ghosts_positions[i][1]])
-    return next_places
-
-
-def update_board_characters(board, last_ghosts_positions, next_places):
-    """
-            Update previous ghosts' positions after their move.
-
-            Parameters: board (list) : Game board
-                        last_ghosts_positions (list) : Last positions of Ghosts
-                        next_places (list) : List characters on positions to which ghosts are moving.
-            Returns: board (list) : Game board after update
-    """
-    board[last_ghosts_positions[0][0]][last_ghosts_positions[0][1]] = next_places[0]
-    board[last_ghosts_positions[1][0]][last_ghosts_positions[1][1]] = next_places[1]
-    board[last_ghosts_positions[2][0]][last_ghosts_positions[2][1]] = next_places[2]
-    return board
+    print("\n".join(board.rows()))
 
 
-def update_board_ghosts(board, new_ghosts_positions):
+def draw_heroes(view, dots, pacman_position, ghosts_positions, last_positions):
     """
-            Update game board after Ghosts' moves.
+            Draw heroes on a view of the game board after a round: places they left show their dot, if any is
+            left, and Pacman and the Ghosts are drawn on their new places. Only the view is written, so the game
+            board and the dots never depend on what is drawn.
 
-            Parameters: board (list) : Game board
-                        new_ghosts_positions (list) : New positions of Ghosts on the board
-            Returns: board (list) : Game board after update
+            Parameters: view (Board) : Copy of the game board used for drawing
+                        dots (bytearray) : Byte per place, 1 where a dot is left (DotLayer.mask or GameState.dots)
+                        pacman_position (list) : Current Pacman's position on the board.
+                        ghosts_positions (list) : Current Ghosts' positions on the board.
+                        last_positions (list) : Positions of Pacman and Ghosts before the round
+            Returns: view (Board) : Updated view
     """
-    for ghost_position in new_ghosts_positions:
-        board[ghost_position[0]][ghost_position[1]] = "X"
-    return board
+    width = view.width
+    for row, col in last_positions:
+        view.set(row, col, "." if dots[row * width + col] else " ")
+    view.set(pacman_position[0], pacman_position[1], "G")
+    for row, col in ghosts_positions:
+        view.set(row, col, "X")
+    return view
 
 
-def count_dots(board):
+def count_dots(dots):
     """
             Count dots on the board.
 
-            Parameters: board (list) : Game board
+            Parameters: dots (DotLayer) : Dots of the game board, whose count is kept up to date
             Returns: dots_count (int) : Number of dots on the board.
     """
-    dots_count = 0
-    for row in board:
-        dots_count += row.count(".")
+    dots_count = dots.remaining
     print(f"Dots left to catch: {dots_count}\n")
     return dots_count
 
 
-def recount_dots(board, pacman_position, dots_counter):
+def recount_dots(dots, pacman_position):
     """
             Recount dots on the board after Pacman's move. Needed to claim victory - if the counter is = 0, Pacman wins.
 
-            Parameters: board (list) : Game board
+            Parameters: dots (DotLayer) : Dots of the game board, Pacman eats the dot on its place
                         pacman_position (list) : Pacman position on board after its move
-                        dots_counter (int) : Counter of dots on the board
             Returns: dots_counter (int) : Counter of dots on the board
     """
-    if board[pacman_position[0]][pacman_position[1]] == ".":
-        dots_counter -= 1
+    dots.eat(pacman_position[0], pacman_position[1])
+    dots_counter = dots.remaining
     print(f"Dots left to catch: {dots_counter}\n")
     return dots_counter
 
@@ -148,10 +104,14 @@ def check_defeat(pacman_position, ghosts_positions):
             Check if Pacman lost the game and was caught by one of the Ghosts.
 
             Parameters: pacman_position (list) : Current Pacman's position
-                        ghosts_positions (list) : Current Ghosts' positions
+                        ghosts_positions (list/ Entities) : Current Ghosts' positions, or the registry of heroes
             Returns: defeat (bool) : Boolean value defining if loosing conditions are met.
     """
-    if pacman_position in ghosts_positions:
+    if isinstance(ghosts_positions, Entities):
+        caught = ghosts_positions.has_ghost(pacman_position)
+    else:
+        caught = pacman_position in ghosts_positions
+    if caught:
         print("\n\n\n----- Ghosts win! -----\n\n\n")
         defeat = True
     else:
@@ -164,89 +124,61 @@ def get_position(hero, board):
             Read position of Pacman (G) or Ghosts (X) on the board.
 
             Parameters: hero (str) : Name of the hero - Pacman or Ghost
-                        board (list) : Game board
-            Returns: [row_number, row.index("G")]/ ghosts_positions (list) : Hero's position on the board
+                        board (Board) : Game board
+            Returns: pacman_position/ ghosts_positions (list) : Hero's position on the board
     """
-    row_number = 0
     if hero == "pacman":
-        for row in board:
-            if "G" in row:
-                return [row_number, row.index("G")]
-            row_number += 1
+        positions = locate(board, PACMAN)
+        if positions:
+            return positions[0]
     if hero == "ghost":
-        ghosts_positions = []
-        for row in board:
-            counter = row.count("X")
-            start = 0
-            while counter >= 1:
-                ghosts_positions.append([row_number, row.index("X", start)])
-                start = row.index("X") + 1
-                counter -= 1
-            row_number += 1
-        return ghosts_positions
-
-
-def log_pacman_moves(log_board, pacman_position):
-    """
-            Log places visited by Pacman on a game board.
-
-            Parameters: log_board (list) : Board to log Pacman's positions
-                        pacman_position (list) : Current Pacman's position
-            Returns: log_board (list) : Board with logged Pacman's positions
-    """
-    log_board[pacman_position[0]][pacman_position[1]] = True
-    return log_board
+        return locate(board, GHOST)
 
 
 def check_if_wall(board, position, vertical=0, horizontal=0):
     """
             Verify if the next position of Pacman or Ghosts is the wall (#).
 
-            Parameters: board (list) : Game board
+            Parameters: board (Board) : Game board
                         position (list) : Current position of a hero that we want to check walls for.
                         vertical/ horizontal (int) : Modifiers needed to check neighbouring fields on the board.
             Returns: True/ False (bool) : Boolean value defining if next position is the wall.
     """
-    if board[position[0] + horizontal][position[1] + vertical] == "#":
+    if board.tiles[(position[0] + horizontal) * board.width + position[1] + vertical] == WALL:
         return True
     return False
 
 
-def move_pacman(board, pacman_position):
+def move_pacman(board, pacman_position, telemetry=NULL_TELEMETRY):
     """
             Allow user to move Pacman by pressing keyboard keys.
 
-            Parameters: board (list) : Game board
+            Parameters: board (Board) : Game board
                         pacman_position (list) : Current Pacman's position on the board.
+                        telemetry (Telemetry) : Telemetry counting wrong moves (off by default)
             Returns: new_pacman_position (list) : Next Pacman's position on the board.
     """
-    move_options = ["w", "s", "a", "d"]
     move = input("Go! ")
-    new_pacman_position = [0, 0]
-    while move not in move_options:
+    while len(move) != 1 or move not in MOVE_OPTIONS:
         print("Wrong move!")
+        telemetry.count("wrong_moves")
         move = input("Go! ")
-    if move == "w":
-        if not check_if_wall(board, pacman_position, horizontal=-1):
-            new_pacman_position = go_up(pacman_position, new_pacman_position)
-        else:
-            new_pacman_position = pacman_position
-    elif move == "s":
-        if not check_if_wall(board, pacman_position, horizontal=1):
-            new_pacman_position = go_down(pacman_position, new_pacman_position)
-        else:
-            new_pacman_position = pacman_position
-    elif move == "a":
-        if not check_if_wall(board, pacman_position, vertical=-1):
-            new_pacman_position = go_left(pacman_position, new_pacman_position)
-        else:
-            new_pacman_position = pacman_position
-    elif move == "d":
-        if not check_if_wall(board, pacman_position, vertical=1):
-            new_pacman_position = go_right(pacman_position, new_pacman_position)
-        else:
-            new_pacman_position = pacman_position
-    return new_pacman_position
+    return move_hero(board, pacman_position, move)
+
+
+def move_hero(board, pacman_position, move):
+    """
+            Move Pacman in chosen direction unless there is a wall. Shared by the console game and the headless engine.
+
+            Parameters: board (Board) : Game board
+                        pacman_position (list) : Current Pacman's position on the board.
+                        move (str) : One of "w", "s", "a", "d", None to stay in place.
+            Returns: new_pacman_position (list) : Next Pacman's position on the board.
+    """
+    direction = MOVE_OPTIONS.find(move) if move else -1
+    if direction < 0 or not board.moves[board.index(pacman_position[0], pacman_position[1])] >> direction & 1:
+        return pacman_position
+    return go(pacman_position, direction)
 
 
 def go_up(last_position, new_position):
@@ -301,110 +233,104 @@ def go_right(last_position, new_position):
     return new_position
 
 
-def move_ghosts(board, ghosts_positions, pacman_position, ghost_3):
+def go(last_position, direction):
     """
-            Move Ghosts, depending on their number.
+            Define Pacman's or Ghost's position when moving in a direction from the board's neighbour table.
+
+            Parameters: last_position (list) : Current hero's position on the board.
+                        direction (int) : 0 - up, 1 - down, 2 - left, 3 - right.
+            Returns: new_position (list) : Hero's position after move.
+    """
+    return (go_up, go_down, go_left, go_right)[direction](last_position, [0, 0])
+
 
-            Parameters: board (list) : Game board
+def move_ghosts(board, ghosts_positions, pacman_position, ghost_3, rng=random, next_hops=None, strategies=None):
+    """
+            Move Ghosts in one pass. Without strategies, Ghosts take turns at the behaviours of Ghosts 1, 2 and 3:
+            Ghost 4 moves like Ghost 1, Ghost 5 like Ghost 2 and so on.
+
+            Parameters: board (Board) : Game board
                         ghosts_positions (list) : Current Ghosts' positions on the board.
                         pacman_position (list) : Current Pacman's position on the board.
-                        ghost_3 (str) : Attribute to define move for Ghost 3.
+                        ghost_3 (str) : Attribute to define move for Ghost 3 and other alternating Ghosts.
+                        rng (random.Random) : Source of randomness for Ghost 1 and Ghost 3 (module random by default).
+                        next_hops (NextHops) : Shortest path table making Ghosts 2 and 3 chase along the maze
+                                               instead of in a straight line (optional).
+                        strategies (list) : One strategy per Ghost from ghosts.make_strategies (optional).
             Returns: new_ghosts_positions (list) : Ghosts' position after their move.
     """
+    if strategies is not None:
+        return [strategy.move(board, ghost, pacman_position, ghost_3, rng, next_hops)
+                for strategy, ghost in zip(strategies, ghosts_positions)]
     new_ghosts_positions = []
     ghost_number = 1
     for ghost in ghosts_positions:
         if ghost_number == 1:
-            new_ghosts_positions.append(move_ghost_1(board, ghost))
+            new_ghosts_positions.append(move_ghost_1(board, ghost, rng))
         elif ghost_number == 2:
-            new_ghosts_positions.append(move_ghost_2(board, ghost, pacman_position))
+            new_ghosts_positions.append(move_ghost_2(board, ghost, pacman_position, next_hops))
         elif ghost_number == 3:
-            new_ghosts_positions.append(move_ghost_3(board, ghost, pacman_position, ghost_3))
-        ghost_number += 1
+            new_ghosts_positions.append(move_ghost_3(board, ghost, pacman_position, ghost_3, rng, next_hops))
+        ghost_number = ghost_number % 3 + 1
     return new_ghosts_positions
 
 
-def move_ghost_1(board, ghost_position):
+def move_ghost_1(board, ghost_position, rng=random):
     """
             Move Ghost 1.
 
-            Parameters: board (list) : Game board
+            Parameters: board (Board) : Game board
                         ghost_position (list) : Current Ghost's position on the board.
+                        rng (random.Random) : Source of randomness (module random by default).
             Returns: new_ghost_position (list) : Ghost's position after its move.
     """
-    ghost_moved = False
-    new_ghost_position = [0, 0]
-    while not ghost_moved:
-        direction = random.randint(0, 3)
-        if direction == 0:
-            if not check_if_wall(board, ghost_position, horizontal=-1):
-                new_ghost_position = go_up(ghost_position, new_ghost_position)
-                ghost_moved = True
-        if direction == 1:
-            if not check_if_wall(board, ghost_position, horizontal=1):
-                new_ghost_position = go_down(ghost_position, new_ghost_position)
-                ghost_moved = True
-        if direction == 2:
-            if not check_if_wall(board, ghost_position, vertical=-1):
-                new_ghost_position = go_left(ghost_position, new_ghost_position)
-                ghost_moved = True
-        if direction == 3:
-            if not check_if_wall(board, ghost_position, vertical=1):
-                new_ghost_position = go_right(ghost_position, new_ghost_position)
-                ghost_moved = True
-    return new_ghost_position
+    moves = MOVES[board.moves[board.index(ghost_position[0], ghost_position[1])]]
+    if not moves:
+        return ghost_position
+    return go(ghost_position, moves[rng.randrange(len(moves))])
 
 
-def move_ghost_2(board, ghost_position, pacman_position):
+def move_ghost_2(board, ghost_position, pacman_position, next_hops=None):
     """
             Move Ghost 2.
 
-            Parameters: board (list) : Game board
+            Parameters: board (Board) : Game board
                         ghost_position (list) : Current Ghost's position on the board.
                         pacman_position (list) : Current Pacman's position on the board.
+                        next_hops (NextHops) : Shortest path table, chase in a straight line if not given.
             Returns: new_ghost_position (list) : Ghost's position after  its move.
     """
-    new_ghost_position = [0, 0]
-    min_distance = count_distances_to_pacman(board, ghost_position, pacman_position)
-    if min_distance == 0:
-        new_ghost_position = go_up(ghost_position, new_ghost_position)
-    elif min_distance == 1:
-        new_ghost_position = go_down(ghost_position, new_ghost_position)
-    elif min_distance == 2:
-        new_ghost_position = go_left(ghost_position, new_ghost_position)
-    elif min_distance == 3:
-        new_ghost_position = go_right(ghost_position, new_ghost_position)
-    return new_ghost_position
+    if next_hops is not None:
+        direction = next_hops.next_direction(ghost_position, pacman_position)
+    else:
+        direction = count_distances_to_pacman(board, ghost_position, pacman_position)
+    if direction is None:
+        return ghost_position
+    return go(ghost_position, direction)
 
 
 def count_distances_to_pacman(board, ghost_position, pacman_position):
     """
             Define distances between Ghost and Pacman. Needed to define the movement of Ghost 2.
 
-            Parameters: board (list) : Game board
+            Parameters: board (Board) : Game board
                         ghost_position (list) : Current Ghost's position on the board.
                         pacman_position (list) : Current Pacman's position on the board.
-            Returns: distances.index(tmp) (int) : Index of the lowest distance between Pacman and Ghost.
-    """
-    distances = []
-    if not check_if_wall(board, ghost_position, horizontal=-1):
-        distances.append(count_distance(ghost_position, pacman_position, horizontal=-1))
-    else:
-        distances.append(1000)
-    if not check_if_wall(board, ghost_position, horizontal=1):
-        distances.append(count_distance(ghost_position, pacman_position, horizontal=1))
-    else:
-        distances.append(1000)
-    if not check_if_wall(board, ghost_position, vertical=-1):
-        distances.append(count_distance(ghost_position, pacman_position, vertical=-1))
-    else:
-        distances.append(1000)
-    if not check_if_wall(board, ghost_position, vertical=1):
-        distances.append(count_distance(ghost_position, pacman_position, vertical=1))
-    else:
-        distances.append(1000)
-    tmp = min(distances)
-    return distances.index(tmp)
+            Returns: direction (int) : Direction with the lowest distance between Pacman and Ghost
+                                       (0 - up, 1 - down, 2 - left, 3 - right), None if Ghost cannot move.
+    """
+    moves = MOVES[board.moves[board.index(ghost_position[0], ghost_position[1])]]
+    if not moves:
+        return None
+    best_direction = moves[0]
+    min_distance = None
+    for direction in moves:
+        horizontal, vertical = STEPS[direction]
+        distance = count_distance(ghost_position, pacman_position, horizontal, vertical)
+        if min_distance is None or distance < min_distance:
+            best_direction = direction
+            min_distance = distance
+    return best_direction
 
 
 def count_distance(ghost_position, pacman_position, horizontal=0, vertical=0):
@@ -421,20 +347,22 @@ def count_distance(ghost_position, pacman_position, horizontal=0, vertical=0):
     return distance
 
 
-def move_ghost_3(board, ghost_position, pacman_position, ghost_3):
+def move_ghost_3(board, ghost_position, pacman_position, ghost_3, rng=random, next_hops=None):
     """
             Move Ghost 3.
 
-            Parameters: board (list) : Game board
+            Parameters: board (Board) : Game board
                         ghost_position (list) : Current Ghost's position on the board.
                         pacman_position (list) : Current Pacman's position on the board.
                         ghost_3 (str) : Attribute to define Ghost's 3 movement.
+                        rng (random.Random) : Source of randomness (module random by default).
+                        next_hops (NextHops) : Shortest path table, chase in a straight line if not given.
             Returns: new_ghost_position (list) : New ghost's position.
     """
     if ghost_3 == "ghost_1":
-        new_ghost_position = move_ghost_1(board, ghost_position)
+        new_ghost_position = move_ghost_1(board, ghost_position, rng)
     elif ghost_3 == "ghost_2":
-        new_ghost_position = move_ghost_2(board, ghost_position, pacman_position)
+        new_ghost_position = move_ghost_2(board, ghost_position, pacman_position, next_hops)
     return new_ghost_position
 
 
@@ -468,51 +396,136 @@ def prepare_ghosts_next_round(new_ghosts_positions, ghost_3):
     return last_ghosts_positions, ghost_3
 
 
-def main():
+def main(render="auto", max_fps=None, telemetry_path=None, autopilot_budget=None, board_file="pacman_board.txt",
+         seed=None, strategies=None, max_frames=None, chase="greedy", autopilot_workers=1):
+    """
+            Play Pacman in the console.
+
+            Parameters: render (str) : "ansi" redraws only changed places, "plain" prints the whole board every round,
+                                       "none" draws nothing, "auto" picks "ansi" on terminals and "plain" otherwise.
+                        max_fps (float) : Maximum number of frames per second (no limit by default)
+                        telemetry_path (str) : File to export per-phase timings, counters and memory use to at the
+                                               end of the game (.json or .csv), also set by PACMAN_TELEMETRY
+                        autopilot_budget (float) : Seconds of Monte Carlo tree search per move to let the computer
+                                                   play Pacman instead of the keyboard (off by default)
+                        board_file (str) : Text file with game board
+                        seed (int) : Seed of the Ghosts' random generator (module random by default)
+                        strategies (list) : Names of the Ghosts' strategies (the board file's by default)
+                        max_frames (int) : Stop after drawing this many frames, e.g. 1 to time the start up
+                        chase (str) : "greedy" to chase Pacman in a straight line, "shortest" to chase along the
+                                      maze with the board's shortest path table
+                        autopilot_workers (int) : Number of processes searching every autopilot's move at once
+            Returns: N/A
+    """
     print("--- WELCOME TO PACMAN GAME! --- ")
     # Game preparation and global variables
-    board = read_board("pacman_board.txt")
-    log_board = copy.deepcopy(board)
+    # The cursor stays visible while the player types moves at the prompt
+    renderer = make_renderer(render, max_fps=max_fps, hide_cursor=autopilot_budget is not None)
+    telemetry = make_telemetry(telemetry_path)
+    board = read_board(board_file)
+    rng = random.Random(seed) if seed is not None else random
     victory = False
     defeat = False
     ghost_3 = "ghost_1"
-    next_places = [" ", " ", " "]
-    last_pacman_position = get_position("pacman", board)
-    dots_counter = count_dots(board)
-    log_board = log_pacman_moves(log_board, last_pacman_position)
-    last_ghosts_positions = get_position("ghost", board)
-
-    while not victory and not defeat:
-        display_board(board)
-        # Pacman moves
-        new_pacman_position = move_pacman(board, last_pacman_position)
-        log_board = log_pacman_moves(log_board, new_pacman_position)
-        dots_counter = recount_dots(board, new_pacman_position, dots_counter)
-
-        # Check if game ends after Pacman's move
-        victory = check_victory(dots_counter)
-        defeat = check_defeat(new_pacman_position, last_ghosts_positions)
-        if victory or defeat:
-            break
-
-        # Ghosts move
-        new_ghosts_positions = move_ghosts(board, last_ghosts_positions, new_pacman_position, ghost_3)
-
-        # Board update
-        board = update_board_pacman(board, last_pacman_position, new_pacman_position)
-        board = update_board_characters(board, last_ghosts_positions, next_places)
-        next_places = get_next_place_in_board(board, log_board, new_ghosts_positions, last_ghosts_positions)
-        board = update_board_ghosts(board, new_ghosts_positions)
-        # Check if game ends after Ghosts' move
-        victory = check_victory(dots_counter)
-        defeat = check_defeat(new_pacman_position, new_ghosts_positions)
-        if victory or defeat:
-            break
-
-        # Preparations for next round
-        last_pacman_position = get_position("pacman", board)
-        last_ghosts_positions, ghost_3 = prepare_ghosts_next_round(new_ghosts_positions, ghost_3)
+    entities = Entities.from_board(board, track_occupancy=True)
+    strategy_names = strategies or board.ghost_strategies
+    strategies = None
+    if strategy_names:
+        from ghosts import make_strategies
+        strategies = make_strategies(board, strategy_names, len(entities.ghosts))
+    next_hops = None
+    if chase == "shortest":
+        from pathfinding import load_next_hops
+        next_hops = load_next_hops(board)
+    autopilot = None
+    if autopilot_budget is not None:
+        from mcts import Autopilot, MctsPlayer
+        autopilot = Autopilot(board, MctsPlayer(autopilot_budget, autopilot_workers, seed=seed, board=board,
+                                                next_hops=next_hops), strategy_names, next_hops)
+    last_pacman_position = entities.pacman
+    # Dots live in their own layer and heroes are only drawn on a view, so the game board is never written
+    dots = DotLayer(board)
+    dots_counter = count_dots(dots)
+    view = board.copy()
+    last_ghosts_positions = entities.ghosts
+    frames = 0
+
+    try:
+        while not victory and not defeat:
+            started = telemetry.clock()
+            renderer.draw(view)
+            started = telemetry.lap("display_board", started)
+            frames += 1
+            if frames == max_frames:
+                break
+            if autopilot is not None and autopilot.out_of_rounds():
+                print(f"\n\n\n----- Autopilot gives up after {autopilot.state.rounds} rounds -----\n\n\n")
+                break
+            # Pacman moves
+            if autopilot is None:
+                new_pacman_position = move_pacman(board, last_pacman_position, telemetry)
+            else:
+                new_pacman_position = autopilot.move_pacman(board, last_pacman_position, last_ghosts_positions,
+                                                            ghost_3)
+            started = telemetry.lap("input", started)
+            last_dots_counter = dots_counter
+            dots_counter = recount_dots(dots, new_pacman_position)
+            telemetry.count("dots_eaten", last_dots_counter - dots_counter)
+            started = telemetry.lap("pacman_update", started)
+
+            # Check if game ends after Pacman's move
+            victory = check_victory(dots_counter)
+            defeat = check_defeat(new_pacman_position, entities)
+            if victory or defeat:
+                break
+
+            # Ghosts move
+            new_ghosts_positions = move_ghosts(board, last_ghosts_positions, new_pacman_position, ghost_3, rng,
+                                               next_hops, strategies)
+            if telemetry.enabled:
+                # Ghosts boxed in by walls or by the strategy's choice
+                telemetry.count("ghosts_stayed", sum(new == last for new, last in zip(new_ghosts_positions,
+                                                                                     last_ghosts_positions)))
+            started = telemetry.lap("move_ghosts", started)
+
+            # Board update
+            view = draw_heroes(view, dots.mask, new_pacman_position, new_ghosts_positions,
+                               [last_pacman_position] + last_ghosts_positions)
+            entities.move_pacman(new_pacman_position)
+            entities.move_ghosts(new_ghosts_positions)
+            started = telemetry.lap("board_update", started)
+            # Check if game ends after Ghosts' move
+            victory = check_victory(dots_counter)
+            defeat = check_defeat(new_pacman_position, entities)
+            if victory or defeat:
+                break
+
+            # Preparations for next round
+            last_pacman_position = entities.pacman
+            last_ghosts_positions, ghost_3 = prepare_ghosts_next_round(new_ghosts_positions, ghost_3)
+            telemetry.end_round()
+        telemetry.end_round()
+    finally:
+        renderer.close()
+        if autopilot is not None:
+            autopilot.player.close()
+    if autopilot is not None:
+        print(autopilot.player.stats())
+    telemetry.close()
 
 
 if __name__ == "__main__":
-    main()
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Play Pacman in the console.")
+    parser.add_argument("--render", choices=("auto", "ansi", "plain", "none"), default="auto")
+    parser.add_argument("--chase", choices=("greedy", "shortest"), default="greedy")
+    parser.add_argument("--telemetry", default=None, metavar="FILE",
+                        help="export per-phase timings, counters and memory use to FILE (.json or .csv)")
+    parser.add_argument("--autopilot", action="store_true", help="let Monte Carlo tree search play Pacman")
+    parser.add_argument("--budget-ms", type=float, default=20.0, help="autopilot's search time per move")
+    parser.add_argument("--workers", type=int, default=1, help="processes searching every autopilot's move")
+    args = parser.parse_args()
+    main(args.render, telemetry_path=args.telemetry,
+         autopilot_budget=args.budget_ms / 1000 if args.autopilot else None, chase=args.chase,
+         autopilot_workers=args.workers)
@@ -0,0 +1,171 @@
+import argparse
+import random
+import sys
+
+from board import WALL, EMPTY, DOT, PACMAN, GHOST
+from ghosts import STRATEGIES
+from loader import GHOSTS_DIRECTIVE
+
+MAX_SIZE = 5000
+# Tiles of a place with code open + 2 * dot: wall, empty place, place with a dot
+TILES = bytes([WALL, EMPTY, WALL, DOT]) + bytes(252)
+
+
+def _place_mask(width, height, row_parity, col_parity):
+    """
+            Mask of the inner places whose row and column have the given parities, as one big integer with
+            a byte per place (1 for chosen places, 0 elsewhere), in the layout of Board.tiles.
+
+            Parameters: width, height (int) : Size of the board
+                        row_parity, col_parity (int) : 1 for odd rows/ columns, 0 for even ones
+            Returns: mask (int) : Place mask
+    """
+    row = bytes(1 if 0 < col < width - 1 and col % 2 == col_parity else 0 for col in range(width))
+    empty = bytes(width)
+    return int.from_bytes(b"".join(row if 0 < row_number < height - 1 and row_number % 2 == row_parity else empty
+                                   for row_number in range(height)), "little")
+
+
+def _random_mask(rng, size, probability):
+    """
+            Mask with each place chosen with a probability, rounded to a multiple of 1/256.
+
+            Parameters: rng (random.Random) : Random generator
+                        size (int) : Number of places
+                        probability (float) : Chance of every place to be chosen
+            Returns: mask (int) : Place mask
+    """
+    threshold = round(min(max(probability, 0.0), 1.0) * 256)
+    table = bytes(1 if value < threshold else 0 for value in range(256))
+    return int.from_bytes(rng.randbytes(size).translate(table), "little")
+
+
+def _count(mask, size):
+    """
+            Number of places chosen by a mask.
+
+            Parameters: mask (int) : Place mask
+                        size (int) : Number of places
+            Returns: count (int) : Number of chosen places
+    """
+    return mask.to_bytes(size, "little").count(1)
+
+
+def _place_hero(tiles, rng, hero, position, width):
+    """
+            Put a hero on a given place, or on a random free place.
+
+            Parameters: tiles (bytearray) : Tiles of the board
+                        rng (random.Random) : Random generator
+                        hero (int) : PACMAN or GHOST
+                        position (list) : [row, col] of the hero, None for a random place
+                        width (int) : Board width
+            Returns: N/A
+    """
+    if position is not None:
+        row, col = position
+        index = row * width + col
+        if not (0 <= row < len(tiles) // width and 0 <= col < width) or tiles[index] not in (EMPTY, DOT):
+            raise ValueError(f"Cannot put {chr(hero)} on {list(position)}: the place is not free")
+    else:
+        index = rng.randrange(len(tiles))
+        while tiles[index] not in (EMPTY, DOT):
+            index = rng.randrange(len(tiles))
+    tiles[index] = hero
+
+
+def generate_maze(width, height, seed=0, wall_density=0.3, dots=1.0, ghosts=3, pacman=None):
+    """
+            Generate a seeded maze in the format of pacman_board.txt. A perfect maze is carved on the places
+            with odd row and column (binary tree algorithm), then walls are knocked out at random until the
+            share of inner walls reaches wall_density, which adds loops but keeps every open place reachable.
+            Works on whole-board masks held in big integers, like Board._build_moves, so 5000 x 5000 boards
+            take seconds.
+
+            Parameters: width, height (int) : Size of the board, from 3 to MAX_SIZE
+                        seed (int) : Seed of the generator
+                        wall_density (float) : Share of inner places that are walls, at most about 0.5 (the
+                                               perfect maze)
+                        dots (float) : Share of open places holding a dot
+                        ghosts (int/ list) : Number of Ghosts on random places, or their [row, col] places
+                        pacman (list) : [row, col] of Pacman (random place by default)
+            Returns: rows (list) : Board rows as strings
+    """
+    if not (3 <= width <= MAX_SIZE and 3 <= height <= MAX_SIZE):
+        raise ValueError(f"Board size must be from 3 x 3 to {MAX_SIZE} x {MAX_SIZE}, got {width} x {height}")
+    rng = random.Random(seed)
+    size = width * height
+    all_places = int.from_bytes(b"\x01" * size, "little")
+    row_bits = 8 * width
+
+    # Perfect maze: every cell carves a passage to the right or upwards, the top row always carves to the
+    # right and the last column of cells always upwards
+    cells = _place_mask(width, height, 1, 1)
+    last_col = width - 2 if width % 2 else width - 3
+    top_row = int.from_bytes(bytes(width) + b"\x01" * width, "little")
+    last_column = int.from_bytes((bytes(last_col) + b"\x01" + bytes(width - last_col - 1)) * height, "little")
+    coin = _random_mask(rng, size, 0.5)
+    carve_right = cells & (coin | top_row) & (all_places ^ last_column)
+    carve_up = cells & (all_places ^ carve_right) & (all_places ^ top_row)
+    open_places = cells | carve_right << 8 | carve_up >> row_bits
+
+    # Knock out walls between cells, then pillars between walls, until the wanted density is reached
+    inner = (width - 2) * (height - 2)
+    to_open = inner - _count(open_places, size) - round(wall_density * inner)
+    between = (_place_mask(width, height, 1, 0) | _place_mask(width, height, 0, 1)) & (all_places ^ open_places)
+    between_count = _count(between, size)
+    if to_open > 0 and between_count:
+        open_places |= between & _random_mask(rng, size, to_open / between_count)
+        to_open = inner - _count(open_places, size) - round(wall_density * inner)
+    pillars = _place_mask(width, height, 0, 0)
+    pillars_count = _count(pillars, size)
+    if to_open > 0 and pillars_count:
+        neighbours = (open_places << 8 | open_places >> 8 | open_places << row_bits | open_places >> row_bits)
+        open_places |= pillars & neighbours & _random_mask(rng, size, to_open / pillars_count)
+
+    with_dots = open_places & _random_mask(rng, size, dots)
+    tiles = bytearray((open_places + 2 * with_dots).to_bytes(size, "little").translate(TILES))
+    heroes = 1 + (ghosts if isinstance(ghosts, int) else len(ghosts))
+    if tiles.count(EMPTY) + tiles.count(DOT) < heroes:
+        raise ValueError(f"The maze has fewer open places than the {heroes} heroes")
+    _place_hero(tiles, rng, PACMAN, pacman, width)
+    for ghost in (range(ghosts) if isinstance(ghosts, int) else ghosts):
+        _place_hero(tiles, rng, GHOST, None if isinstance(ghosts, int) else ghost, width)
+    return [tiles[row * width:(row + 1) * width].decode("ascii") for row in range(height)]
+
+
+def write_board(text_file, rows, strategies=None):
+    """
+            Save a board in the format read by read_board.
+
+            Parameters: text_file (str/ file) : Text file to write, or an open stream
+                        rows (list) : Board rows as strings
+                        strategies (list) : Names of the Ghosts' strategies to add below the board (optional)
+            Returns: N/A
+    """
+    text = "\n".join(rows) + "\n"
+    if strategies:
+        text += f"{GHOSTS_DIRECTIVE} {' '.join(strategies)}\n"
+    if hasattr(text_file, "write"):
+        text_file.write(text)
+    else:
+        with open(text_file, "w") as board_file:
+            board_file.write(text)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a seeded Pacman maze.")
+    parser.add_argument("width", type=int)
+    parser.add_argument("height", type=int)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--wall-density", type=float, default=0.3, help="share of inner places that are walls")
+    parser.add_argument("--dots", type=float, default=1.0, help="share of open places holding a dot")
+    parser.add_argument("--ghosts", type=int, default=3)
+    parser.add_argument("--pacman", type=int, nargs=2, default=None, metavar=("ROW", "COL"))
+    parser.add_argument("--strategies", nargs="+", default=None, choices=sorted(STRATEGIES),
+                        help="Ghosts' strategies to write below the board")
+    parser.add_argument("--output", "-o", default=None, help="text file to write (stdout by default)")
+    args = parser.parse_args()
+    maze_rows = generate_maze(args.width, args.height, args.seed, args.wall_density, args.dots, args.ghosts,
+                              args.pacman)
+    write_board(args.output or sys.stdout, maze_rows, args.strategies)
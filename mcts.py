@@ -0,0 +1,412 @@
+import argparse
+import math
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from board import MOVES
+from engine import ACTIONS, GameState, VICTORY, DEFEAT, read_board, watch_game
+from main import move_hero
+
+DEFAULT_BUDGET = 0.02
+DEFAULT_DEPTH = 20
+DEFAULT_EXPLORATION = 1.4
+# Share of a rollout's reward for the progress towards the dots, the rest is for surviving
+PROGRESS_WEIGHT = 0.6
+# Rounds without eating a dot after which surviving is worth half as much, so Pacman stops hiding from the Ghosts
+STALL_HALF_LIFE = 20
+# main() has no round limit, the autopilot gives up after this many rounds
+AUTOPILOT_MAX_ROUNDS = 3000
+
+# Board and games of a worker process: the board is sent once by _init_worker, games are rebuilt when a new
+# game starts and brought up to date with the dots eaten since the last search otherwise
+_worker = {"board": None, "next_hops": None, "game": None, "state": None}
+
+
+class Node:
+    """
+            Node of an open-loop search tree: it stands for a sequence of Pacman's moves from the root, whatever
+            the Ghosts did in between, and holds the rewards of the rollouts that went through it.
+    """
+
+    __slots__ = ("children", "visits", "value")
+
+    def __init__(self):
+        self.children = {}
+        self.visits = 0
+        self.value = 0.0
+
+
+def dot_distances(state, depth):
+    """
+            Distances along the maze from the places around Pacman to the nearest dot, found by a breadth-first
+            search starting from all dots at once. The search stops depth steps past Pacman's own distance, as
+            a rollout cannot end farther away.
+
+            Parameters: state (GameState) : Current game state
+                        depth (int) : Maximum number of rounds of a rollout
+            Returns: distances (dict) : Distance per flat index of the places reached
+    """
+    board = state.board
+    dots = state.dots
+    offsets = board.offsets
+    moves = board.moves
+    frontier = []
+    index = dots.find(1)
+    while index >= 0:
+        frontier.append(index)
+        index = dots.find(1, index + 1)
+    distances = dict.fromkeys(frontier, 0)
+    pacman = state.pacman_position[0] * board.width + state.pacman_position[1]
+    distance = 0
+    limit = None
+    while frontier and (limit is None or distance < limit):
+        if limit is None and pacman in distances:
+            limit = distance + depth
+        distance += 1
+        next_frontier = []
+        for index in frontier:
+            for direction in MOVES[moves[index]]:
+                neighbour = index + offsets[direction]
+                if neighbour not in distances:
+                    distances[neighbour] = distance
+                    next_frontier.append(neighbour)
+        frontier = next_frontier
+    return distances
+
+
+def rollout_action(state, distances):
+    """
+            Pacman's move in a rollout: onto a dot if there is one next to Pacman, towards the nearest dot
+            otherwise, picking at random between equally good moves. Moves onto or next to a Ghost come last.
+
+            Parameters: state (GameState) : Current game state
+                        distances (dict) : Distances to the nearest dot from dot_distances at the root
+            Returns: action (str) : Chosen move, None to stay when Pacman is boxed in
+    """
+    board = state.board
+    index = state.pacman_position[0] * board.width + state.pacman_position[1]
+    offsets = board.offsets
+    dots = state.dots
+    moves = MOVES[board.moves[index]]
+    if not moves:
+        return None
+    ghosts = [row * board.width + column for row, column in state.ghosts_positions]
+    best = []
+    best_distance = None
+    for direction in moves:
+        neighbour = index + offsets[direction]
+        distance = 0 if dots[neighbour] else distances.get(neighbour, len(distances))
+        for ghost in ghosts:
+            if ghost == neighbour or ghost - neighbour in offsets:
+                distance += len(distances) + 1
+        if best_distance is None or distance < best_distance:
+            best = [direction]
+            best_distance = distance
+        elif distance == best_distance:
+            best.append(direction)
+    return ACTIONS[best[0] if len(best) == 1 else state.rng.choice(best)]
+
+
+def rollout_reward(state, root, depth, distances, stalled=0):
+    """
+            Reward of a finished rollout: 1 for a victory, otherwise PROGRESS_WEIGHT times the progress towards
+            the dots (dots eaten plus steps closer to the nearest dot, per round of the rollout) and the rest for
+            surviving, halved for a defeat at the end of the rollout and less the earlier Pacman was caught.
+            Surviving loses its worth the longer Pacman went without eating, so idling away from the Ghosts never
+            beats heading for the dots for long.
+
+            Parameters: state (GameState) : State at the end of the rollout
+                        root (Snapshot) : State at the root of the search
+                        depth (int) : Maximum number of rounds of a rollout
+                        distances (dict) : Distances to the nearest dot from dot_distances at the root
+                        stalled (int) : Rounds the game went without Pacman eating a dot before the search
+            Returns: reward (float) : Reward from 0 to 1
+    """
+    if state.outcome == VICTORY:
+        return 1.0
+    played = state.rounds - root.rounds
+    width = state.board.width
+    start = distances.get(root.pacman_position[0] * width + root.pacman_position[1], 0)
+    end = distances.get(state.pacman_position[0] * width + state.pacman_position[1], start)
+    progress = min(root.dots_counter - state.dots_counter + max(start - end, 0), depth) / depth
+    survival = 0.5 * played / depth if state.outcome == DEFEAT else 1.0
+    return PROGRESS_WEIGHT * progress + (1 - PROGRESS_WEIGHT) * survival * 0.5 ** (stalled / STALL_HALF_LIFE)
+
+
+def search(state, budget=DEFAULT_BUDGET, depth=DEFAULT_DEPTH, exploration=DEFAULT_EXPLORATION, rng=None,
+           stalled=0):
+    """
+            Run Monte Carlo tree search from a state for a time budget. Every rollout starts from the state,
+            picks Pacman's moves down the tree with UCT, adds a node and plays rollout_action against the game's
+            Ghosts until depth rounds were played. The state is rewound with restore() after each
+            rollout, and the Ghosts draw new random numbers every time.
+
+            Parameters: state (GameState) : Current game state, left unchanged
+                        budget (float) : Seconds to search for
+                        depth (int) : Maximum number of rounds of a rollout
+                        exploration (float) : UCT exploration constant
+                        rng (random.Random) : Random generator of the rollouts (a new one by default)
+                        stalled (int) : Rounds the game went without Pacman eating a dot, see rollout_reward
+            Returns: stats (dict) : Per first move [visits, total reward] and number of rollouts
+    """
+    deadline = time.perf_counter() + budget
+    game_rng = state.rng
+    state.rng = rng or random.Random()
+    root = Node()
+    root_snapshot = state.snapshot()
+    distances = dot_distances(state, depth)
+    max_rounds = state.max_rounds
+    state.max_rounds = min(max_rounds, root_snapshot.rounds + depth)
+    step = state.step
+    rollouts = 0
+    try:
+        while rollouts == 0 or time.perf_counter() < deadline:
+            node = root
+            path = [root]
+            # Selection and expansion
+            while state.outcome is None:
+                actions = state.legal_actions()
+                untried = [action for action in actions if action not in node.children]
+                if untried:
+                    action = untried[0] if len(untried) == 1 else state.rng.choice(untried)
+                    child = node.children[action] = Node()
+                    node = child
+                    path.append(node)
+                    step(action)
+                    break
+                log_visits = math.log(node.visits)
+                children = node.children
+                action = max(actions, key=lambda move: children[move].value / children[move].visits + exploration
+                             * math.sqrt(log_visits / children[move].visits))
+                node = children[action]
+                path.append(node)
+                step(action)
+            # Rollout
+            while state.outcome is None:
+                step(rollout_action(state, distances))
+            reward = rollout_reward(state, root_snapshot, depth, distances, stalled)
+            for node in path:
+                node.visits += 1
+                node.value += reward
+            state.restore(root_snapshot, rng=False)
+            rollouts += 1
+    finally:
+        state.restore(root_snapshot, rng=False)
+        state.max_rounds = max_rounds
+        state.rng = game_rng
+    return {"moves": {action: [child.visits, child.value] for action, child in root.children.items()},
+            "rollouts": rollouts}
+
+
+def _init_worker(board, next_hops):
+    """
+            Keep the board in a worker process.
+
+            Parameters: board (Board) : Game board
+                        next_hops (NextHops) : Shortest path table of the board (optional)
+            Returns: N/A
+    """
+    _worker["board"] = board
+    _worker["next_hops"] = next_hops
+
+
+def _search_in_worker(game, position, budget, depth, exploration, seed, stalled):
+    """
+            Search from a game position in a worker process. The worker keeps its own GameState per game and
+            only replays the dots eaten since its last search.
+
+            Parameters: game (tuple) : (game id, seed, max_rounds, ghosts, strategies) of the game
+                        position (tuple) : (pacman_position, ghosts_positions, ghost_3, rounds, eaten) of the state
+                        budget, depth, exploration, stalled : See search
+                        seed (int) : Seed of the rollouts
+            Returns: stats (dict) : See search
+    """
+    pacman_position, ghosts_positions, ghost_3, rounds, eaten = position
+    state = _worker["state"]
+    if _worker["game"] != game or len(eaten) < len(state.eaten):
+        _, game_seed, max_rounds, ghosts, strategies = game
+        state = GameState(_worker["board"], game_seed, max_rounds, ghosts, _worker["next_hops"],
+                          strategies=strategies)
+        _worker["game"] = game
+        _worker["state"] = state
+    for index in eaten[len(state.eaten):]:
+        state.dots[index] = 0
+        state.dots_counter -= 1
+        state.eaten.append(index)
+    state.pacman_position = pacman_position
+    state.ghosts_positions = ghosts_positions
+    state.ghost_3 = ghost_3
+    state.rounds = rounds
+    return search(state, budget, depth, exploration, random.Random(seed), stalled)
+
+
+class MctsPlayer:
+    """
+            Pacman policy thinking with Monte Carlo tree search for a fixed time per move. With several workers,
+            each worker process searches the same position with its own random numbers (root parallelisation)
+            and their visit counts are added up. Usable wherever a policy is, e.g. run_game or watch_game.
+
+            Parameters: budget (float) : Seconds of search per move
+                        workers (int) : Number of worker processes, 1 to search in this process
+                        depth (int) : Maximum number of rounds of a rollout
+                        exploration (float) : UCT exploration constant
+                        seed (int) : Seed of the rollouts
+                        board (Board) : Game board, needed with several workers
+                        next_hops (NextHops) : Shortest path table of the board, to send to workers (optional)
+    """
+
+    def __init__(self, budget=DEFAULT_BUDGET, workers=1, depth=DEFAULT_DEPTH, exploration=DEFAULT_EXPLORATION,
+                 seed=None, board=None, next_hops=None):
+        self.budget = budget
+        self.workers = workers
+        self.depth = depth
+        self.exploration = exploration
+        self.rng = random.Random(seed)
+        self.rollouts = 0
+        self.moves = 0
+        self.seconds = 0.0
+        self._game = None
+        # (state id, dots left, round) when Pacman last ate a dot
+        self._progress = None
+        self._executor = None
+        if workers > 1:
+            if board is None:
+                raise ValueError("MctsPlayer needs the board to search with several workers")
+            self._executor = ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(board, next_hops))
+
+    def __call__(self, state):
+        """
+                Choose Pacman's move.
+
+                Parameters: state (GameState) : Current game state
+                Returns: action (str) : Move with the most visits, None to stay when Pacman is boxed in
+        """
+        start = time.perf_counter()
+        progress = self._progress
+        if (progress is None or progress[0] != id(state) or progress[1] != state.dots_counter
+                or state.rounds < progress[2]):
+            progress = self._progress = (id(state), state.dots_counter, state.rounds)
+        stalled = state.rounds - progress[2]
+        if self._executor is None:
+            results = [search(state, self.budget, self.depth, self.exploration, self.rng, stalled)]
+        else:
+            if self._game is None or self._game[0] != id(state) or state.rounds == 0:
+                strategies = [strategy.name for strategy in state.strategies] if state.strategies else None
+                self._game = (id(state), self.rng.getrandbits(32), state.max_rounds, len(state.ghosts_positions),
+                              strategies)
+            position = (state.pacman_position, state.ghosts_positions, state.ghost_3, state.rounds, state.eaten)
+            futures = [self._executor.submit(_search_in_worker, self._game, position, self.budget, self.depth,
+                                             self.exploration, self.rng.getrandbits(64), stalled)
+                       for _ in range(self.workers)]
+            results = [future.result() for future in futures]
+        visits = {}
+        for result in results:
+            self.rollouts += result["rollouts"]
+            for action, (action_visits, _) in result["moves"].items():
+                visits[action] = visits.get(action, 0) + action_visits
+        self.moves += 1
+        self.seconds += time.perf_counter() - start
+        if not visits:
+            return state.legal_actions()[0]
+        return max(visits, key=visits.get)
+
+    def stats(self):
+        """
+                Search statistics so far.
+
+                Parameters: N/A
+                Returns: stats (dict) : Moves chosen, rollouts, rollouts per second and mean time per move
+        """
+        return {
+            "moves": self.moves,
+            "rollouts": self.rollouts,
+            "rollouts_per_second": self.rollouts / self.seconds if self.seconds else 0.0,
+            "ms_per_move": self.seconds / self.moves * 1000 if self.moves else 0.0,
+        }
+
+    def close(self):
+        """
+                Stop the worker processes.
+
+                Parameters: N/A
+                Returns: N/A
+        """
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+
+class Autopilot:
+    """
+            MCTS player standing in for the keyboard in main(). It mirrors main()'s game in a GameState sharing
+            the board, which main() never writes.
+
+            Parameters: board (Board) : Game board of main()
+                        player (MctsPlayer) : Player choosing the moves (a single process one by default)
+                        strategies (list) : Names of the Ghosts' strategies, as used by main()
+                        next_hops (NextHops) : Shortest path table main()'s Ghosts chase with (optional)
+    """
+
+    def __init__(self, board, player=None, strategies=None, next_hops=None):
+        self.player = player or MctsPlayer()
+        self.state = GameState(board, max_rounds=AUTOPILOT_MAX_ROUNDS, next_hops=next_hops, strategies=strategies)
+
+    def move_pacman(self, board, pacman_position, ghosts_positions, ghost_3):
+        """
+                Choose and play Pacman's move, like main.move_pacman but without input().
+
+                Parameters: board (Board) : Game board
+                            pacman_position (list) : Current Pacman's position on the board.
+                            ghosts_positions (list) : Current Ghosts' positions on the board.
+                            ghost_3 (str) : Attribute to define move for Ghost 3 and other alternating Ghosts.
+                Returns: new_pacman_position (list) : Next Pacman's position on the board.
+        """
+        state = self.state
+        state.pacman_position = pacman_position
+        state.ghosts_positions = list(ghosts_positions)
+        state.ghost_3 = ghost_3
+        new_pacman_position = move_hero(board, pacman_position, self.player(state))
+        index = new_pacman_position[0] * board.width + new_pacman_position[1]
+        if state.dots[index]:
+            state.dots[index] = 0
+            state.dots_counter -= 1
+            state.eaten.append(index)
+        state.rounds += 1
+        return new_pacman_position
+
+    def out_of_rounds(self):
+        """
+                Check if the autopilot played AUTOPILOT_MAX_ROUNDS rounds, after which main() stops the game.
+
+                Parameters: N/A
+                Returns: out_of_rounds (bool) : Boolean value defining if the game has to stop
+        """
+        return self.state.rounds >= self.state.max_rounds
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Let Monte Carlo tree search play Pacman.")
+    parser.add_argument("board", nargs="?", default="pacman_board.txt")
+    parser.add_argument("--games", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET * 1000, help="search time per move")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--depth", type=int, default=DEFAULT_DEPTH, help="maximum rounds of a rollout")
+    parser.add_argument("--max-rounds", type=int, default=1000)
+    parser.add_argument("--watch", action="store_true", help="draw the games")
+    args = parser.parse_args()
+    game_board = read_board(args.board)
+    mcts_player = MctsPlayer(args.budget_ms / 1000, args.workers, args.depth, seed=args.seed, board=game_board)
+    try:
+        for game_seed in range(args.seed, args.seed + args.games):
+            if args.watch:
+                print(watch_game(game_board, mcts_player, game_seed, args.max_rounds))
+            else:
+                state = GameState(game_board, game_seed, args.max_rounds)
+                while state.step(mcts_player(state)) is None:
+                    pass
+                print(dict(state.stats(), seed=game_seed))
+    finally:
+        mcts_player.close()
+    print(mcts_player.stats())
@@ -0,0 +1,146 @@
+import hashlib
+import os
+from array import array
+
+from board import OPEN_MASK
+
+NO_MOVE = 255
+CACHE_MAGIC = b"PHOP2"
+DEFAULT_CACHE_DIR = os.environ.get("PACMAN_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "pacman"))
+
+
+def board_hash(board):
+    """
+            Hash of the maze layout. Only walls are hashed, so moving heroes or eating dots keeps the hash.
+
+            Parameters: board (Board) : Game board
+            Returns: digest (str) : Hex digest of the layout
+    """
+    digest = hashlib.sha256(f"{board.width}x{board.height}:".encode("ascii"))
+    digest.update(board.tiles.translate(OPEN_MASK))
+    return digest.hexdigest()
+
+
+class NextHops:
+    """
+            All-pairs shortest path table of a maze. For every pair of open places it stores the direction of the
+            first step on a shortest path between them (0 - up, 1 - down, 2 - left, 3 - right, NO_MOVE when there
+            is no path), one byte per pair.
+
+            Parameters: board (Board) : Game board the table was built for
+                        next_hops (bytearray) : Table built by build_next_hops, None to build it
+    """
+
+    __slots__ = ("width", "cells", "ids", "size", "next_hops", "board_hash")
+
+    def __init__(self, board, next_hops=None):
+        self.width = board.width
+        self.board_hash = board_hash(board)
+        open_places = board.tiles.translate(OPEN_MASK)
+        self.cells = array("i", (index for index, is_open in enumerate(open_places) if is_open))
+        self.ids = array("i", [-1]) * len(open_places)
+        for cell_id, index in enumerate(self.cells):
+            self.ids[index] = cell_id
+        self.size = len(self.cells)
+        if next_hops is None:
+            next_hops = build_next_hops(board, self.cells)
+        if len(next_hops) != self.size * self.size:
+            raise ValueError(f"Expected {self.size * self.size} next hops, got {len(next_hops)}")
+        self.next_hops = next_hops
+
+    def next_direction(self, position, target):
+        """
+                Direction of the first step on a shortest path from one place to another.
+
+                Parameters: position (list) : Current place on the board
+                            target (list) : Place to reach
+                Returns: direction (int) : 0 - up, 1 - down, 2 - left, 3 - right, None if there is no path
+                                           or both places are the same.
+        """
+        source_id = self.ids[position[0] * self.width + position[1]]
+        target_id = self.ids[target[0] * self.width + target[1]]
+        direction = self.next_hops[target_id * self.size + source_id]
+        return None if direction == NO_MOVE else direction
+
+
+def build_next_hops(board, cells):
+    """
+            Run a breadth-first search from every open place to fill the next hop table. Like Board._build_moves,
+            a search works on masks of the whole board held in big integers, a bit per place, so a step is a
+            few shifts instead of a loop over places. A wall column pads every row, so left and right shifts
+            never wrap around to the next row. Neighbours on a grid are always one step apart from the target,
+            so keeping the places by distance modulo 3 is enough to find the neighbour one step closer.
+
+            Parameters: board (Board) : Game board
+                        cells (array) : Flat index of every open place, by place id
+            Returns: next_hops (bytearray) : Row t holds, for every place s, the first direction from s towards t,
+                                             trying up, down, left and right in that order.
+    """
+    size = len(cells)
+    width = board.width
+    stride = width + 1
+    places = stride * board.height
+    rows = board.tiles.translate(OPEN_MASK)
+    padded = b"".join(rows[start:start + width] + b"\x00" for start in range(0, len(rows), width))
+    open_places = int(padded[::-1].translate(bytes.maketrans(b"\x00\x01", b"01")), 2) if size else 0
+    # Hex digit per place of the rows: 0 to 3 for a direction, 7 for no path, 4 for walls dropped at the end
+    wall_digits = 4 * int(format(((1 << places) - 1) ^ open_places, "b"), 16)
+    digits = bytes.maketrans(b"01237", bytes([0, 1, 2, 3, NO_MOVE]))
+    shifts = (-stride, stride, -1, 1)
+    next_hops = bytearray(size * size)
+    for target_id, index in enumerate(cells):
+        target = 1 << (index + index // width)
+        unreached = open_places ^ target
+        # Places by distance to the target modulo 3
+        by_distance = [target, 0, 0]
+        frontier = target
+        distance = 0
+        while frontier:
+            frontier = (frontier << stride | frontier >> stride | frontier << 1 | frontier >> 1) & unreached
+            unreached ^= frontier
+            distance += 1
+            by_distance[distance % 3] |= frontier
+        unreached |= target
+        found = unreached
+        closer = []
+        for shift in shifts:
+            towards = 0
+            for distance in range(3):
+                farther = by_distance[distance - 1]
+                towards |= by_distance[distance] & (farther << -shift if shift < 0 else farther >> shift)
+            towards &= ~found
+            found |= towards
+            closer.append(towards)
+        low_bit = int(format(closer[1] | closer[3] | unreached, "b"), 16)
+        high_bit = int(format(closer[2] | closer[3] | unreached, "b"), 16)
+        row = low_bit + 2 * high_bit + 4 * int(format(unreached, "b"), 16) + wall_digits
+        next_hops[target_id * size:(target_id + 1) * size] = format(row, f"0{places}x")[::-1].encode(
+            "ascii").translate(digits, b"4")
+    return next_hops
+
+
+def load_next_hops(board, cache_dir=DEFAULT_CACHE_DIR):
+    """
+            Get the next hop table of a board, from the on-disk cache if it was already built for the same maze.
+
+            Parameters: board (Board) : Game board
+                        cache_dir (str) : Directory of cached tables, None to disable the cache
+            Returns: next_hops (NextHops) : Shortest path table of the board
+    """
+    if cache_dir is None:
+        return NextHops(board)
+    cache_file = os.path.join(cache_dir, board_hash(board) + ".hops")
+    try:
+        with open(cache_file, "rb") as cached:
+            if cached.read(len(CACHE_MAGIC)) == CACHE_MAGIC:
+                return NextHops(board, bytearray(cached.read()))
+    except (OSError, ValueError):
+        pass
+    next_hops = NextHops(board)
+    os.makedirs(cache_dir, exist_ok=True)
+    temporary_file = f"{cache_file}.{os.getpid()}.tmp"
+    with open(temporary_file, "wb") as cache:
+        cache.write(CACHE_MAGIC)
+        cache.write(next_hops.next_hops)
+    os.replace(temporary_file, cache_file)
+    return next_hops
@@ -0,0 +1,230 @@
+import argparse
+import asyncio
+import os
+import stat
+import sys
+import time
+
+from engine import GameState, update_view, read_board
+from ghosts import STRATEGIES
+from pathfinding import load_next_hops
+from render import make_renderer
+from telemetry import make_telemetry
+from replay import ReplayRecorder
+
+# Keys read from the terminal and the moves they stand for, arrows send ESC [ A/B/C/D
+KEYS = {
+    b"w": "w", b"s": "s", b"a": "a", b"d": "d",
+    b"\x1b[A": "w", b"\x1b[B": "s", b"\x1b[D": "a", b"\x1b[C": "d",
+}
+# Ctrl-C is not a key here: the terminal keeps sending SIGINT, which ends the game with KeyboardInterrupt
+QUIT_KEYS = (b"q",)
+
+
+class TickStats:
+    """
+            Timing of a fixed rate game loop. Jitter is how late a tick started compared to its schedule, an overrun
+            is a tick whose work did not fit in the tick interval.
+
+            Parameters: interval (float) : Tick interval in seconds
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.ticks = 0
+        self.overruns = 0
+        self.total_jitter = 0.0
+        self.max_jitter = 0.0
+        self.total_work = 0.0
+        self.max_work = 0.0
+
+    def record(self, jitter, work):
+        """
+                Record one tick.
+
+                Parameters: jitter (float) : Delay between the scheduled and the actual tick start in seconds
+                            work (float) : Time spent on the tick in seconds
+                Returns: N/A
+        """
+        self.ticks += 1
+        self.total_jitter += jitter
+        self.max_jitter = max(self.max_jitter, jitter)
+        self.total_work += work
+        self.max_work = max(self.max_work, work)
+        if jitter + work > self.interval:
+            self.overruns += 1
+
+    def report(self):
+        """
+                Summarise tick timing.
+
+                Parameters: N/A
+                Returns: report (dict) : Ticks, overruns and mean/ max jitter and work time in milliseconds
+        """
+        ticks = self.ticks or 1
+        return {
+            "ticks": self.ticks,
+            "overruns": self.overruns,
+            "tick_ms": self.interval * 1000,
+            "mean_jitter_ms": self.total_jitter / ticks * 1000,
+            "max_jitter_ms": self.max_jitter * 1000,
+            "mean_work_ms": self.total_work / ticks * 1000,
+            "max_work_ms": self.max_work * 1000,
+        }
+
+
+def check_input(stream=None):
+    """
+            Check that keys can be read from an input stream without blocking the event loop: the event loop can
+            only watch terminals, pipes and sockets, not regular files.
+
+            Parameters: stream (file) : Input stream (sys.stdin by default)
+            Returns: N/A
+    """
+    fd = (stream or sys.stdin).fileno()
+    mode = os.fstat(fd).st_mode
+    if not (os.isatty(fd) or stat.S_ISFIFO(mode) or stat.S_ISSOCK(mode)):
+        raise ValueError("real time play reads keys from a terminal or a pipe, not from a file")
+
+
+class KeyReader:
+    """
+            Non-blocking keyboard reader. Puts a terminal in cbreak mode (no line buffering, no echo) and reads keys
+            from the event loop whenever stdin is readable, so the game never waits for Enter. Ctrl-C still
+            interrupts the game.
+
+            Parameters: stream (file) : Input stream (sys.stdin by default)
+    """
+
+    def __init__(self, stream=None):
+        check_input(stream)
+        self.stream = stream or sys.stdin
+        self.fd = self.stream.fileno()
+        self.move = None
+        self.quit = False
+        self._saved_mode = None
+
+    def __enter__(self):
+        if os.isatty(self.fd):
+            import termios
+            import tty
+            self._saved_mode = termios.tcgetattr(self.fd)
+            tty.setcbreak(self.fd)
+        asyncio.get_running_loop().add_reader(self.fd, self._read)
+        return self
+
+    def __exit__(self, *exc_info):
+        asyncio.get_running_loop().remove_reader(self.fd)
+        if self._saved_mode is not None:
+            import termios
+            termios.tcsetattr(self.fd, termios.TCSADRAIN, self._saved_mode)
+
+    def _read(self):
+        """
+                Read available keys and remember the last move.
+
+                Parameters: N/A
+                Returns: N/A
+        """
+        data = os.read(self.fd, 1024)
+        if not data:
+            self.quit = True
+            return
+        index = 0
+        while index < len(data):
+            key = data[index:index + 3] if data[index:index + 1] == b"\x1b" else data[index:index + 1]
+            if key in QUIT_KEYS:
+                self.quit = True
+            elif key in KEYS:
+                self.move = KEYS[key]
+            index += len(key)
+
+
+async def play(board, tick_rate=10, seed=None, next_hops=None, renderer=None, max_rounds=float("inf"),
+               stream=None, replay_path=None, strategies=None, telemetry=None):
+    """
+            Play Pacman in real time. Every tick Pacman keeps going in the direction of the last pressed key and the
+            Ghosts move, whether a key was pressed or not.
+
+            Parameters: board (Board) : Game board from read_board
+                        tick_rate (float) : Ticks per second
+                        seed (int) : Seed of the Ghosts' random generator
+                        next_hops (NextHops) : Shortest path table for Ghosts chasing along the maze (optional)
+                        renderer (AnsiRenderer) : Renderer to draw with (ANSI or plain renderer on stdout by default)
+                        max_rounds (int) : Number of ticks after which the game ends with a timeout
+                        stream (file) : Input stream (sys.stdin by default)
+                        replay_path (str) : File to write a binary replay of the game to (optional)
+                        strategies (list) : Names of the Ghosts' strategies, see engine.GameState
+                        telemetry (Telemetry) : Telemetry recording the phases of every tick (make_telemetry() by
+                                                default, which is off unless PACMAN_TELEMETRY is set)
+            Returns: result (dict) : Game statistics and tick timing
+    """
+    keys = KeyReader(stream)
+    renderer = renderer or make_renderer()
+    telemetry = telemetry or make_telemetry()
+    loop = asyncio.get_running_loop()
+    state = GameState(board, seed, max_rounds, next_hops=next_hops, strategies=strategies)
+    view = board.copy()
+    timing = TickStats(1 / tick_rate)
+    recorder = ReplayRecorder(state, seed) if replay_path is not None else None
+    try:
+        renderer.draw(view)
+        with keys:
+            next_tick = loop.time()
+            while state.outcome is None and not keys.quit:
+                start = loop.time()
+                jitter = max(0.0, start - next_tick)
+                started = telemetry.clock()
+                last_positions = [state.pacman_position] + state.ghosts_positions
+                state.step(keys.move)
+                started = telemetry.lap("step", started)
+                update_view(view, state, last_positions)
+                started = telemetry.lap("update_view", started)
+                if recorder is not None:
+                    recorder.record(state)
+                    started = telemetry.lap("record", started)
+                renderer.draw(view)
+                started = telemetry.lap("draw", started)
+                timing.record(jitter, loop.time() - start)
+
+                next_tick += timing.interval
+                delay = next_tick - loop.time()
+                if delay < 0:
+                    # Do not try to catch up on missed ticks, start again from now
+                    next_tick = loop.time()
+                    delay = 0
+                await asyncio.sleep(delay)
+                telemetry.lap("sleep", started)
+                telemetry.end_round()
+    finally:
+        renderer.close()
+    if recorder is not None:
+        recorder.save(replay_path, state.outcome)
+    result = state.stats()
+    result.update(timing.report())
+    telemetry.close()
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Play Pacman in real time (w/s/a/d or arrows, q to quit).")
+    parser.add_argument("board", nargs="?", default="pacman_board.txt")
+    parser.add_argument("--tick-rate", type=float, default=10)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--chase", choices=("greedy", "shortest"), default="greedy")
+    parser.add_argument("--replay", default=None, help="file to record the game to")
+    parser.add_argument("--ghost-strategies", nargs="+", default=None, choices=sorted(STRATEGIES),
+                        help="strategy of every Ghost, repeated when there are more Ghosts")
+    parser.add_argument("--telemetry", default=None, metavar="FILE",
+                        help="export per-phase timings, counters and memory use to FILE (.json or .csv)")
+    args = parser.parse_args()
+    try:
+        check_input()
+    except ValueError as error:
+        parser.error(str(error))
+    game_board = read_board(args.board)
+    game_next_hops = load_next_hops(game_board) if args.chase == "shortest" else None
+    started = time.perf_counter()
+    print(asyncio.run(play(game_board, args.tick_rate, args.seed, game_next_hops, replay_path=args.replay,
+                           strategies=args.ghost_strategies, telemetry=make_telemetry(args.telemetry))))
+    print(f"Played for {time.perf_counter() - started:.1f} s")
@@ -0,0 +1,173 @@
+import sys
+import time
+
+CLEAR_SCREEN = "\x1b[2J\x1b[H"
+CLEAR_BELOW = "\x1b[J"
+HIDE_CURSOR = "\x1b[?25l"
+SHOW_CURSOR = "\x1b[?25h"
+
+
+class NullRenderer:
+    """
+            Renderer drawing nothing, for games nobody watches.
+    """
+
+    frames = 0
+
+    def draw(self, board, force=False):
+        """
+                Skip the frame.
+
+                Parameters: board (Board) : Game board
+                            force (bool) : Unused
+                Returns: drawn (bool) : Always False
+        """
+        return False
+
+    def close(self):
+        """
+                Nothing to clean up.
+
+                Parameters: N/A
+                Returns: N/A
+        """
+
+
+class PlainRenderer:
+    """
+            Renderer printing the whole board every frame, for streams that are not terminals.
+
+            Parameters: stream (file) : Output stream (sys.stdout by default)
+    """
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+        self.frames = 0
+
+    def draw(self, board, force=False):
+        """
+                Print the whole board.
+
+                Parameters: board (Board) : Game board
+                            force (bool) : Unused
+                Returns: drawn (bool) : Always True
+        """
+        self.stream.write("\n".join(board.rows()) + "\n")
+        self.stream.flush()
+        self.frames += 1
+        return True
+
+    def close(self):
+        """
+                Nothing to clean up.
+
+                Parameters: N/A
+                Returns: N/A
+        """
+
+
+class AnsiRenderer:
+    """
+            Terminal renderer redrawing only the places changed since the previous frame. The first frame draws the
+            whole board and starts tracking board.dirty; next frames move the cursor to each changed place with ANSI
+            escape codes and write the whole frame with a single stream write. Whatever is printed after a frame
+            (prompts, messages) appears below the board and is cleared by the next frame.
+
+            Parameters: stream (file) : Output stream (sys.stdout by default)
+                        max_fps (float) : Maximum number of frames per second, no limit by default
+                        drop_frames (bool) : Skip frames coming too early instead of waiting. Skipped changes are
+                                             drawn with the next frame.
+                        hide_cursor (bool) : Hide the cursor until close(), keep it visible when the player types
+                                             at a prompt below the board
+    """
+
+    def __init__(self, stream=None, max_fps=None, drop_frames=False, hide_cursor=True):
+        self.stream = stream or sys.stdout
+        self.min_interval = 1 / max_fps if max_fps else 0.0
+        self.drop_frames = drop_frames
+        self.hide_cursor = hide_cursor
+        self.board = None
+        self.last_frame = None
+        self.frames = 0
+        self.cells_written = 0
+        self.bytes_written = 0
+
+    def draw(self, board, force=False):
+        """
+                Draw a frame.
+
+                Parameters: board (Board) : Game board
+                            force (bool) : Draw even if the frame rate cap says it is too early
+                Returns: drawn (bool) : False if the frame was dropped by the frame rate cap
+        """
+        if self.min_interval and self.last_frame is not None and not force:
+            wait = self.last_frame + self.min_interval - time.perf_counter()
+            if wait > 0:
+                if self.drop_frames:
+                    return False
+                time.sleep(wait)
+
+        if board is not self.board or board.dirty is None:
+            parts = [HIDE_CURSOR if self.hide_cursor else "", CLEAR_SCREEN, "\n".join(board.rows())]
+            self.cells_written += len(board.tiles)
+            self.board = board
+            board.dirty = set()
+        else:
+            parts = []
+            tiles = board.tiles
+            width = board.width
+            next_index = None
+            for index in sorted(board.dirty):
+                # Neighbouring places on the same row are written without moving the cursor again
+                if index != next_index or index % width == 0:
+                    row, col = divmod(index, width)
+                    parts.append(f"\x1b[{row + 1};{col + 1}H")
+                parts.append(chr(tiles[index]))
+                next_index = index + 1
+            self.cells_written += len(board.dirty)
+            board.dirty.clear()
+        parts.append(f"\x1b[{board.height + 1};1H{CLEAR_BELOW}")
+
+        frame = "".join(parts)
+        self.stream.write(frame)
+        self.stream.flush()
+        self.bytes_written += len(frame)
+        self.frames += 1
+        self.last_frame = time.perf_counter()
+        return True
+
+    def close(self):
+        """
+                Stop tracking changes and show the cursor again.
+
+                Parameters: N/A
+                Returns: N/A
+        """
+        if self.board is not None:
+            self.board.dirty = None
+            self.board = None
+        self.stream.write(SHOW_CURSOR)
+        self.stream.flush()
+
+
+def make_renderer(mode="auto", stream=None, max_fps=None, hide_cursor=True):
+    """
+            Create a renderer.
+
+            Parameters: mode (str) : "ansi" (only changed places), "plain" (whole board), "none" (no output) or
+                                     "auto" ("ansi" on terminals, "plain" otherwise)
+                        stream (file) : Output stream (sys.stdout by default)
+                        max_fps (float) : Maximum number of frames per second of the "ansi" renderer
+                        hide_cursor (bool) : Hide the cursor while the "ansi" renderer draws
+            Returns: renderer (AnsiRenderer/ PlainRenderer/ NullRenderer) : Renderer
+    """
+    stream = stream or sys.stdout
+    if mode == "auto":
+        mode = "ansi" if stream.isatty() else "plain"
+    if mode == "ansi":
+        return AnsiRenderer(stream, max_fps, hide_cursor=hide_cursor)
+    if mode == "plain":
+        return PlainRenderer(stream)
+    if mode == "none":
+        return NullRenderer()
+    raise ValueError(f"Unknown render mode: {mode}")
@@ -0,0 +1,357 @@
+import hashlib
+import mmap
+import struct
+from bisect import bisect_right
+
+from board import DOT, EMPTY, GHOST, PACMAN
+
+MAGIC = b"PREP"
+VERSION = 1
+# magic, version, outcome, ghosts, width, height, keyframe interval, rounds, keyframes, seed, board hash
+HEADER = struct.Struct("<4sBBHIIIIIq32s")
+OUTCOMES = (None, "victory", "defeat", "timeout")
+NO_SEED = -(2 ** 63)
+# Translation tables between a dot mask (one byte per place) and a string of "0"/ "1" characters
+_MASK_TO_BITS = bytes(48 + (value & 1) for value in range(256))
+_BITS_TO_MASK = bytes(value - 48 if value in (48, 49) else 0 for value in range(256))
+
+
+def replay_board_hash(board):
+    """
+            Hash of everything a replay depends on: size, walls, dots and starting positions.
+
+            Parameters: board (Board) : Game board from read_board
+            Returns: digest (bytes) : SHA-256 digest of the board
+    """
+    digest = hashlib.sha256(f"{board.width}x{board.height}:".encode("ascii"))
+    digest.update(board.tiles)
+    return digest.digest()
+
+
+def pack_dots(dots):
+    """
+            Pack a dot mask into a bitset.
+
+            Parameters: dots (bytearray) : One byte per place, 1 where there is a dot
+            Returns: bitset (bytes) : Bit i set when place i has a dot
+    """
+    size = (len(dots) + 7) // 8
+    if not dots:
+        return b""
+    return int(dots.translate(_MASK_TO_BITS)[::-1], 2).to_bytes(size, "little")
+
+
+def unpack_dots(bitset, places):
+    """
+            Unpack a bitset made by pack_dots.
+
+            Parameters: bitset (bytes) : Bit i set when place i has a dot
+                        places (int) : Number of places on the board
+            Returns: dots (bytearray) : One byte per place, 1 where there is a dot
+    """
+    if not places:
+        return bytearray()
+    bits = format(int.from_bytes(bitset, "little"), "b").zfill(places)[::-1][:places]
+    return bytearray(bits.encode("ascii").translate(_BITS_TO_MASK))
+
+
+def move_direction(board, last_index, new_index):
+    """
+            Two-bit code of a move. Staying in place is coded as a direction blocked by a wall.
+
+            Parameters: board (Board) : Game board
+                        last_index (int) : Flat index of the place before the move
+                        new_index (int) : Flat index of the place after the move
+            Returns: direction (int) : 0 - up, 1 - down, 2 - left, 3 - right, None for staying on a place
+                                       without any wall around
+    """
+    if new_index != last_index:
+        return board.offsets.index(new_index - last_index)
+    mask = board.moves[last_index]
+    for direction in range(4):
+        if not mask >> direction & 1:
+            return direction
+    return None
+
+
+class ReplayRecorder:
+    """
+            Record a game into a replay: per round moves of Pacman and Ghosts as 2-bit directions, plus keyframes
+            holding full positions and the dot bitset every keyframe_interval rounds.
+
+            Parameters: state (GameState) : Game to record, before its first round
+                        seed (int) : Seed the game was started with
+                        keyframe_interval (int) : Rounds between two keyframes
+    """
+
+    def __init__(self, state, seed=None, keyframe_interval=64):
+        self.board = state.board
+        self.seed = seed
+        self.keyframe_interval = keyframe_interval
+        self.ghosts = len(state.ghosts_positions)
+        self.round_size = (2 * (1 + self.ghosts) + 7) // 8
+        self.moves = bytearray()
+        self.keyframes = []
+        self.rounds = 0
+        self._last = self._indexes(state)
+        self._add_keyframe(state)
+
+    def _indexes(self, state):
+        """
+                Flat indexes of Pacman and the Ghosts.
+
+                Parameters: state (GameState) : Game state
+                Returns: indexes (list) : Pacman's index followed by the Ghosts' indexes
+        """
+        width = self.board.width
+        return [row * width + col for row, col in [state.pacman_position] + state.ghosts_positions]
+
+    def _add_keyframe(self, state):
+        """
+                Store the full state after the current round.
+
+                Parameters: state (GameState) : Game state
+                Returns: N/A
+        """
+        indexes = self._indexes(state)
+        self.keyframes.append(struct.pack(f"<I{len(indexes)}I", self.rounds, *indexes) + pack_dots(state.dots))
+
+    def record(self, state):
+        """
+                Record the round just played.
+
+                Parameters: state (GameState) : Game state after the round
+                Returns: N/A
+        """
+        self.rounds += 1
+        indexes = self._indexes(state)
+        packed = 0
+        needs_keyframe = self.rounds % self.keyframe_interval == 0 or state.outcome is not None
+        for number, (last_index, new_index) in enumerate(zip(self._last, indexes)):
+            direction = move_direction(self.board, last_index, new_index)
+            if direction is None:
+                needs_keyframe = True
+                direction = 0
+            packed |= direction << (2 * number)
+        self.moves += packed.to_bytes(self.round_size, "little")
+        self._last = indexes
+        if needs_keyframe:
+            self._add_keyframe(state)
+
+    def save(self, path, outcome=None):
+        """
+                Write the replay file.
+
+                Parameters: path (str) : Replay file
+                            outcome (str) : Outcome of the game
+                Returns: N/A
+        """
+        header = HEADER.pack(MAGIC, VERSION, OUTCOMES.index(outcome), self.ghosts, self.board.width,
+                             self.board.height, self.keyframe_interval, self.rounds, len(self.keyframes),
+                             NO_SEED if self.seed is None else self.seed, replay_board_hash(self.board))
+        with open(path, "wb") as replay_file:
+            replay_file.write(header)
+            replay_file.write(self.moves)
+            for keyframe in self.keyframes:
+                replay_file.write(keyframe)
+
+
+class Replay:
+    """
+            Memory-mapped replay file. Opening it only parses the header; moves and keyframes are read from the
+            mapping when a round is reconstructed.
+
+            Parameters: path (str) : Replay file
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as replay_file:
+            self.data = mmap.mmap(replay_file.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, outcome, self.ghosts, self.width, self.height, self.keyframe_interval, self.rounds,
+         self.keyframe_count, seed, self.board_hash) = HEADER.unpack_from(self.data)
+        if magic != MAGIC or version != VERSION:
+            self.data.close()
+            raise ValueError(f"{path} is not a version {VERSION} replay file")
+        self.outcome = OUTCOMES[outcome]
+        self.seed = None if seed == NO_SEED else seed
+        self.round_size = (2 * (1 + self.ghosts) + 7) // 8
+        self.places = self.width * self.height
+        self.moves_offset = HEADER.size
+        self.keyframes_offset = self.moves_offset + self.rounds * self.round_size
+        self.keyframe_size = 4 * (2 + self.ghosts) + (self.places + 7) // 8
+        self._keyframe_rounds = None
+
+    def close(self):
+        """
+                Unmap the file.
+
+                Parameters: N/A
+                Returns: N/A
+        """
+        self.data.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def header(self):
+        """
+                Game summary stored in the header.
+
+                Parameters: N/A
+                Returns: header (dict) : Outcome, rounds, seed, number of Ghosts and board size
+        """
+        return {"outcome": self.outcome, "rounds": self.rounds, "seed": self.seed, "ghosts": self.ghosts,
+                "width": self.width, "height": self.height, "board_hash": self.board_hash.hex()}
+
+    def keyframe_rounds(self):
+        """
+                Rounds at which keyframes were stored, read once from the mapping.
+
+                Parameters: N/A
+                Returns: rounds (list) : Sorted rounds of the keyframes
+        """
+        if self._keyframe_rounds is None:
+            self._keyframe_rounds = [struct.unpack_from("<I", self.data, self.keyframes_offset + number *
+                                                        self.keyframe_size)[0]
+                                     for number in range(self.keyframe_count)]
+        return self._keyframe_rounds
+
+    def _keyframe(self, number):
+        """
+                Read a keyframe.
+
+                Parameters: number (int) : Keyframe number
+                Returns: indexes (list) : Flat indexes of Pacman and the Ghosts
+                         dots (bytearray) : One byte per place, 1 where there is a dot
+        """
+        offset = self.keyframes_offset + number * self.keyframe_size
+        values = struct.unpack_from(f"<{2 + self.ghosts}I", self.data, offset)
+        bitset = self.data[offset + 4 * (2 + self.ghosts):offset + self.keyframe_size]
+        return list(values[1:]), unpack_dots(bitset, self.places)
+
+    def _apply_round(self, board, round_number, indexes, dots):
+        """
+                Move Pacman and the Ghosts as recorded for a round, Pacman eating the dot he lands on.
+
+                Parameters: board (Board) : Board the game was played on
+                            round_number (int) : Round to apply, from 1
+                            indexes (list) : Flat indexes of Pacman and the Ghosts, updated in place
+                            dots (bytearray) : Dot mask, updated in place
+                Returns: N/A
+        """
+        offset = self.moves_offset + (round_number - 1) * self.round_size
+        packed = int.from_bytes(self.data[offset:offset + self.round_size], "little")
+        moves = board.moves
+        for hero, index in enumerate(indexes):
+            direction = packed >> (2 * hero) & 3
+            if moves[index] >> direction & 1:
+                indexes[hero] = index + board.offsets[direction]
+        dots[indexes[0]] = 0
+
+    def iter_states(self, board, start_round=0):
+        """
+                Reconstruct the game round by round, seeking to start_round through the closest keyframe.
+
+                Parameters: board (Board) : Board the game was played on
+                            start_round (int) : First round to yield, 0 for the starting position
+                Returns: generator of (round_number, indexes, dots) tuples where indexes are the flat indexes of
+                         Pacman and the Ghosts and dots has one byte per place, 1 where there is a dot.
+                         Both are reused between rounds.
+        """
+        if replay_board_hash(board) != self.board_hash:
+            raise ValueError("Replay was recorded on a different board")
+        if not 0 <= start_round <= self.rounds:
+            raise ValueError(f"Round {start_round} is not in 0..{self.rounds}")
+        keyframe_rounds = self.keyframe_rounds()
+        number = bisect_right(keyframe_rounds, start_round) - 1
+        indexes, dots = self._keyframe(number)
+        for round_number in range(keyframe_rounds[number] + 1, start_round + 1):
+            self._apply_round(board, round_number, indexes, dots)
+        yield start_round, indexes, dots
+        for round_number in range(start_round + 1, self.rounds + 1):
+            if number + 1 < len(keyframe_rounds) and keyframe_rounds[number + 1] == round_number:
+                # Keyframes also cover rounds whose moves could not be coded in 2 bits
+                number += 1
+                indexes, dots = self._keyframe(number)
+            else:
+                self._apply_round(board, round_number, indexes, dots)
+            yield round_number, indexes, dots
+
+    def state_at(self, board, round_number):
+        """
+                Reconstruct the game after a round, starting from the closest keyframe before it.
+
+                Parameters: board (Board) : Board the game was played on
+                            round_number (int) : Round to reconstruct, 0 for the starting position
+                Returns: pacman_position (list) : Pacman's position
+                         ghosts_positions (list) : Ghosts' positions
+                         dots (bytearray) : One byte per place, 1 where there is a dot
+        """
+        _, indexes, dots = next(self.iter_states(board, round_number))
+        positions = [list(divmod(index, board.width)) for index in indexes]
+        return positions[0], positions[1:], dots
+
+
+def scan_replays(paths):
+    """
+            Read the headers of many replays without loading their moves.
+
+            Parameters: paths (list) : Replay files
+            Returns: generator of (path, header) tuples, see Replay.header
+    """
+    for path in paths:
+        with Replay(path) as replay:
+            yield path, replay.header()
+
+
+def play_replay(path, board, renderer, start_round=0):
+    """
+            Draw a replay from a chosen round to its end.
+
+            Parameters: path (str) : Replay file
+                        board (Board) : Board the game was played on
+                        renderer (AnsiRenderer) : Renderer to draw with, its frame rate cap sets the playback speed
+                        start_round (int) : First round to draw
+            Returns: header (dict) : Game summary, see Replay.header
+    """
+    with Replay(path) as replay:
+        view = board.copy()
+        width = board.width
+        last_indexes = []
+        for round_number, indexes, dots in replay.iter_states(board, start_round):
+            if round_number == start_round:
+                for index, tile in enumerate(board.tiles):
+                    if tile in (DOT, PACMAN, GHOST):
+                        view.tiles[index] = DOT if dots[index] else EMPTY
+            for index in last_indexes:
+                view.set(index // width, index % width, "." if dots[index] else " ")
+            for index in indexes[1:]:
+                view.set(index // width, index % width, "X")
+            view.set(indexes[0] // width, indexes[0] % width, "G")
+            last_indexes = list(indexes)
+            renderer.draw(view, force=round_number == replay.rounds)
+        renderer.close()
+        return replay.header()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from main import read_board
+    from render import make_renderer
+
+    parser = argparse.ArgumentParser(description="Play back or summarise Pacman replays.")
+    parser.add_argument("replays", nargs="+")
+    parser.add_argument("--board", default="pacman_board.txt")
+    parser.add_argument("--round", type=int, default=0, help="round to start playback from")
+    parser.add_argument("--fps", type=float, default=10)
+    parser.add_argument("--scan", action="store_true", help="only print the headers")
+    args = parser.parse_args()
+    if args.scan:
+        for replay_path, replay_header in scan_replays(args.replays):
+            print(replay_path, replay_header)
+    else:
+        print(play_replay(args.replays[0], read_board(args.board), make_renderer(max_fps=args.fps), args.round))
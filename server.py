@@ -0,0 +1,273 @@
+import argparse
+import asyncio
+import json
+import time
+from array import array
+
+from engine import GameState, update_view, read_board
+from entities import Entities
+from ghosts import STRATEGIES
+from pathfinding import load_next_hops
+from telemetry import percentile, PERCENTILES
+
+# Client lines and the moves they stand for, "-" stays in place
+MOVE_LINES = {b"w": "w", b"s": "s", b"a": "a", b"d": "d", b"-": None}
+QUIT_LINE = b"q"
+PLAY_COMMAND = b"PLAY"
+STATS_COMMAND = b"STATS"
+DEFAULT_PORT = 8765
+
+
+class Session:
+    """
+            One game hosted by the server. The game runs on its own GameState with the rules of main(), and a copy
+            of the board tracks the places changed by every round, which are all a client gets after the board
+            itself.
+
+            Parameters: board (Board) : Game board from read_board, shared by all sessions
+                        seed (int) : Seed of the Ghosts' random generator
+                        max_rounds (int) : Number of rounds after which the game ends with a timeout
+                        next_hops (NextHops) : Shortest path table for Ghosts chasing along the maze (optional)
+                        strategies (list) : Names of the Ghosts' strategies, see engine.GameState
+                        entities (Entities) : Starting positions found once for the board (optional)
+    """
+
+    __slots__ = ("seed", "state", "view", "ticks", "total_latency", "max_latency")
+
+    def __init__(self, board, seed=None, max_rounds=1000, next_hops=None, strategies=None, entities=None):
+        self.seed = seed
+        self.state = GameState(board, seed, max_rounds, next_hops=next_hops, entities=entities,
+                               strategies=strategies)
+        self.view = board.copy()
+        self.view.dirty = set()
+        self.ticks = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+    def board_message(self):
+        """
+                Message sent when the game starts: "BOARD <width> <height>" followed by the board rows.
+
+                Parameters: N/A
+                Returns: message (bytes) : Lines to send
+        """
+        view = self.view
+        return f"BOARD {view.width} {view.height}\n".encode("ascii") + b"".join(
+            view.tiles[row * view.width:(row + 1) * view.width] + b"\n" for row in range(view.height))
+
+    def tick(self, action):
+        """
+                Play one round and describe what changed: "TICK <round> <dots left> <outcome> <cells>" where
+                outcome is "-" while the game goes on and cells are "<flat index>:<tile>" separated by commas (a
+                tile may be a space, so clients only strip the newline).
+
+                Parameters: action (str) : One of "w", "s", "a", "d", None to stay in place
+                Returns: message (bytes) : Line to send
+        """
+        state = self.state
+        view = self.view
+        last_positions = [state.pacman_position] + state.ghosts_positions
+        state.step(action)
+        update_view(view, state, last_positions)
+        tiles = view.tiles
+        cells = ",".join(f"{index}:{chr(tiles[index])}" for index in sorted(view.dirty))
+        view.dirty.clear()
+        return f"TICK {state.rounds} {state.dots_counter} {state.outcome or '-'} {cells}\n".encode("ascii")
+
+    def record(self, latency):
+        """
+                Record the time the server took to answer a move.
+
+                Parameters: latency (float) : Seconds from reading the move to writing the answer
+                Returns: N/A
+        """
+        self.ticks += 1
+        self.total_latency += latency
+        self.max_latency = max(self.max_latency, latency)
+
+    def report(self):
+        """
+                Summarise the session.
+
+                Parameters: N/A
+                Returns: report (dict) : Game statistics, ticks and mean/ max tick latency in milliseconds
+        """
+        result = self.state.stats()
+        result.update(seed=self.seed, ticks=self.ticks,
+                      mean_tick_ms=self.total_latency / self.ticks * 1000 if self.ticks else 0.0,
+                      max_tick_ms=self.max_latency * 1000)
+        return result
+
+
+class GameServer:
+    """
+            Single process asyncio server hosting many games at once over a line-based TCP protocol. A client
+            sends "PLAY" (or "PLAY <seed>") and gets the board, then sends one move per line ("w", "s", "a",
+            "d" or "-" to stay, "q" to quit) and gets the places changed by each round, see Session. When the
+            game ends the server sends "SESSION" and the session's report as JSON, and closes the connection.
+            "STATS" returns the server's statistics as one JSON line. Rounds only advance when the client moves, like
+            in main(), so an idle session costs nothing but its memory.
+
+            Parameters: board (Board) : Game board from read_board
+                        seed (int) : Seed of the first session, session n uses seed + n unless the client picks one
+                        max_rounds (int) : Number of rounds after which a game ends with a timeout
+                        next_hops (NextHops) : Shortest path table for Ghosts chasing along the maze (optional)
+                        strategies (list) : Names of the Ghosts' strategies, see engine.GameState
+    """
+
+    def __init__(self, board, seed=0, max_rounds=1000, next_hops=None, strategies=None):
+        self.board = board
+        self.seed = seed
+        self.max_rounds = max_rounds
+        self.next_hops = next_hops
+        self.strategies = strategies
+        self.entities = Entities.from_board(board)
+        self.started = time.perf_counter()
+        self.sessions_started = 0
+        self.sessions_finished = 0
+        self.active = 0
+        self.peak_active = 0
+        self.outcomes = {}
+        self.ticks = 0
+        self.tick_latencies = array("d")
+        self.session_latencies = array("d")
+
+    async def handle(self, reader, writer):
+        """
+                Serve one client connection until it quits, its game ends or it disconnects.
+
+                Parameters: reader (asyncio.StreamReader) : Client input
+                            writer (asyncio.StreamWriter) : Client output
+                Returns: N/A
+        """
+        session = None
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                received = time.perf_counter()
+                line = line.rstrip(b"\r\n")
+                if session is not None and line in MOVE_LINES:
+                    writer.write(session.tick(MOVE_LINES[line]))
+                    latency = time.perf_counter() - received
+                    session.record(latency)
+                    self.ticks += 1
+                    self.tick_latencies.append(latency)
+                    if session.state.outcome is not None:
+                        break
+                elif line == QUIT_LINE:
+                    break
+                elif line.startswith(PLAY_COMMAND) and session is None:
+                    arguments = line[len(PLAY_COMMAND):].split()
+                    seed = int(arguments[0]) if arguments else self.seed + self.sessions_started
+                    session = Session(self.board, seed, self.max_rounds, self.next_hops, self.strategies,
+                                      self.entities)
+                    self.sessions_started += 1
+                    self.active += 1
+                    self.peak_active = max(self.peak_active, self.active)
+                    writer.write(session.board_message())
+                elif line == STATS_COMMAND:
+                    writer.write(json.dumps(self.report()).encode("ascii") + b"\n")
+                else:
+                    writer.write(b"ERROR " + line[:32] + b"\n")
+                await writer.drain()
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            if session is not None:
+                self.active -= 1
+                self.sessions_finished += 1
+                outcome = session.state.outcome or "quit"
+                self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+                if session.ticks:
+                    self.session_latencies.append(session.total_latency / session.ticks)
+            try:
+                if session is not None:
+                    writer.write(b"SESSION " + json.dumps(session.report()).encode("ascii") + b"\n")
+                await writer.drain()
+                writer.close()
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    def report(self):
+        """
+                Summarise what the server did so far. Sessions and ticks per second are over the server's uptime,
+                latencies are the time from reading a move to writing its answer, in milliseconds.
+
+                Parameters: N/A
+                Returns: report (dict) : Session counts, throughput and tick latency percentiles
+        """
+        uptime = time.perf_counter() - self.started
+        ticks = sorted(self.tick_latencies)
+        sessions = sorted(self.session_latencies)
+        report = {
+            "uptime": uptime,
+            "sessions_started": self.sessions_started,
+            "sessions_finished": self.sessions_finished,
+            "active_sessions": self.active,
+            "peak_active_sessions": self.peak_active,
+            "outcomes": dict(self.outcomes),
+            "sessions_per_second": self.sessions_finished / uptime if uptime else 0.0,
+            "ticks": self.ticks,
+            "ticks_per_second": self.ticks / uptime if uptime else 0.0,
+            "max_tick_ms": ticks[-1] * 1000 if ticks else 0.0,
+        }
+        for percent in PERCENTILES:
+            report[f"tick_p{percent}_ms"] = percentile(ticks, percent) * 1000
+        for percent in PERCENTILES:
+            report[f"session_mean_tick_p{percent}_ms"] = percentile(sessions, percent) * 1000
+        return report
+
+    async def start(self, host="127.0.0.1", port=DEFAULT_PORT):
+        """
+                Start listening. Port 0 picks a free port, read it from the returned server's sockets.
+
+                Parameters: host (str) : Address to listen on
+                            port (int) : TCP port
+                Returns: server (asyncio.Server) : Listening server
+        """
+        self.started = time.perf_counter()
+        return await asyncio.start_server(self.handle, host, port, limit=2 ** 16, backlog=4096)
+
+
+async def serve(game_server, host="127.0.0.1", port=DEFAULT_PORT, report_every=None):
+    """
+            Run a game server until it is cancelled, printing its statistics every report_every seconds.
+
+            Parameters: game_server (GameServer) : Server to run
+                        host (str) : Address to listen on
+                        port (int) : TCP port
+                        report_every (float) : Seconds between statistics reports, None for none
+            Returns: N/A
+    """
+    server = await game_server.start(host, port)
+    async with server:
+        print(f"Serving Pacman on {host}:{server.sockets[0].getsockname()[1]}", flush=True)
+        if not report_every:
+            await server.serve_forever()
+        while True:
+            await asyncio.sleep(report_every)
+            print(json.dumps(game_server.report()), flush=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Host Pacman games for many clients over TCP.")
+    parser.add_argument("board", nargs="?", default="pacman_board.txt")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-rounds", type=int, default=1000)
+    parser.add_argument("--chase", choices=("greedy", "shortest"), default="greedy")
+    parser.add_argument("--ghost-strategies", nargs="+", default=None, choices=sorted(STRATEGIES),
+                        help="strategy of every Ghost, repeated when there are more Ghosts")
+    parser.add_argument("--report-every", type=float, default=10.0, help="seconds between statistics reports")
+    args = parser.parse_args()
+    game_board = read_board(args.board)
+    game_server = GameServer(game_board, args.seed, args.max_rounds,
+                             load_next_hops(game_board) if args.chase == "shortest" else None, args.ghost_strategies)
+    try:
+        asyncio.run(serve(game_server, args.host, args.port, args.report_every))
+    except KeyboardInterrupt:
+        print(json.dumps(game_server.report()))
@@ -0,0 +1,249 @@
+import gc
+import os
+import sys
+import time
+from array import array
+
+# Environment variable turning telemetry on, its value is the file to export to (.json or .csv)
+TELEMETRY_VARIABLE = "PACMAN_TELEMETRY"
+PERCENTILES = (50, 90, 99)
+
+
+def percentile(ordered, percent):
+    """
+            Nearest-rank percentile of sorted samples.
+
+            Parameters: ordered (list) : Sorted samples
+                        percent (float) : Percentile, from 0 to 100
+            Returns: value (float) : Percentile, 0.0 without samples
+    """
+    if not ordered:
+        return 0.0
+    rank = max(1, -(-len(ordered) * percent // 100))
+    return ordered[int(rank) - 1]
+
+
+class NullTelemetry:
+    """
+            Telemetry recording nothing, used when telemetry is off. Every hook is a method doing nothing, so the
+            instrumented code costs a couple of calls per phase.
+    """
+
+    enabled = False
+
+    def clock(self):
+        """
+                Time stamp to pass to lap.
+
+                Parameters: N/A
+                Returns: time (float) : Always 0.0
+        """
+        return 0.0
+
+    def lap(self, phase, started):
+        """
+                Skip the phase.
+
+                Parameters: phase (str) : Name of the phase
+                            started (float) : Time stamp from clock or lap
+                Returns: time (float) : Always 0.0
+        """
+        return 0.0
+
+    def count(self, counter, amount=1):
+        """
+                Skip the counter.
+
+                Parameters: counter (str) : Name of the counter
+                            amount (int) : Increment
+                Returns: N/A
+        """
+
+    def end_round(self):
+        """
+                Skip the round.
+
+                Parameters: N/A
+                Returns: N/A
+        """
+
+    def close(self):
+        """
+                Nothing to export.
+
+                Parameters: N/A
+                Returns: report (dict) : Always None
+        """
+        return None
+
+
+class Telemetry:
+    """
+            Per-phase timings, counters and memory use of a game loop. The loop calls lap() after each phase,
+            count() when something worth counting happens and end_round() after each round. Memory use is the net
+            change in memory blocks held by the interpreter (sys.getallocatedblocks) over a round, so blocks
+            allocated and freed within the round cancel out, and the number of garbage collector runs.
+
+            Parameters: path (str) : File to export to when the game ends, .csv for CSV, JSON otherwise (optional)
+    """
+
+    enabled = True
+
+    def __init__(self, path=None):
+        self.path = path
+        self.phases = {}
+        self.counters = {}
+        self.rounds = 0
+        self.round_net_blocks = array("q")
+        self.round_times = array("d")
+        self._round_start = time.perf_counter()
+        self._blocks = sys.getallocatedblocks()
+        self._collections = self._gc_collections()
+
+    @staticmethod
+    def _gc_collections():
+        """
+                Number of garbage collector runs so far, all generations together.
+
+                Parameters: N/A
+                Returns: collections (int) : Number of runs
+        """
+        return sum(generation["collections"] for generation in gc.get_stats())
+
+    def clock(self):
+        """
+                Time stamp to pass to lap.
+
+                Parameters: N/A
+                Returns: time (float) : Current time in seconds
+        """
+        return time.perf_counter()
+
+    def lap(self, phase, started):
+        """
+                Record the time spent on a phase.
+
+                Parameters: phase (str) : Name of the phase
+                            started (float) : Time stamp from clock or the previous lap
+                Returns: time (float) : Current time, the start of the next phase
+        """
+        now = time.perf_counter()
+        samples = self.phases.get(phase)
+        if samples is None:
+            samples = self.phases[phase] = array("d")
+        samples.append(now - started)
+        return now
+
+    def count(self, counter, amount=1):
+        """
+                Increase a counter.
+
+                Parameters: counter (str) : Name of the counter
+                            amount (int) : Increment
+                Returns: N/A
+        """
+        self.counters[counter] = self.counters.get(counter, 0) + amount
+
+    def end_round(self):
+        """
+                Record the duration and the net change in memory blocks of the round that just ended.
+
+                Parameters: N/A
+                Returns: N/A
+        """
+        now = time.perf_counter()
+        blocks = sys.getallocatedblocks()
+        self.rounds += 1
+        self.round_times.append(now - self._round_start)
+        self.round_net_blocks.append(blocks - self._blocks)
+        self._round_start = now
+        self._blocks = blocks
+
+    @staticmethod
+    def _summary(samples, scale=1.0):
+        """
+                Count, total, mean, percentiles and maximum of samples.
+
+                Parameters: samples (array) : Samples
+                            scale (float) : Factor applied to the results, 1000 turns seconds into milliseconds
+                Returns: summary (dict) : Statistics of the samples
+        """
+        ordered = sorted(samples)
+        summary = {"count": len(ordered), "total": sum(ordered) * scale,
+                   "mean": sum(ordered) / len(ordered) * scale if ordered else 0.0,
+                   "max": ordered[-1] * scale if ordered else 0.0}
+        for percent in PERCENTILES:
+            summary[f"p{percent}"] = percentile(ordered, percent) * scale
+        return summary
+
+    def report(self):
+        """
+                Summarise what was recorded. Times are in milliseconds.
+
+                Parameters: N/A
+                Returns: report (dict) : Per phase and per round timing percentiles, counters and memory use
+        """
+        return {
+            "rounds": self.rounds,
+            "phases": {phase: self._summary(samples, 1000) for phase, samples in self.phases.items()},
+            "round": self._summary(self.round_times, 1000),
+            "net_blocks_per_round": self._summary(self.round_net_blocks),
+            "gc_collections": self._gc_collections() - self._collections,
+            "counters": dict(self.counters),
+        }
+
+    def export(self, path):
+        """
+                Write the report to a file, as CSV rows (kind, name, count, total, mean, p50, p90, p99, max) when
+                the file name ends with .csv and as JSON otherwise.
+
+                Parameters: path (str) : File to write
+                Returns: report (dict) : The exported report
+        """
+        # csv and json are only imported here, so games with telemetry off do not load them
+        import csv
+        import json
+
+        report = self.report()
+        if os.path.splitext(path)[1].lower() == ".csv":
+            columns = ["count", "total", "mean"] + [f"p{percent}" for percent in PERCENTILES] + ["max"]
+            with open(path, "w", newline="") as report_file:
+                writer = csv.writer(report_file)
+                writer.writerow(["kind", "name"] + columns)
+                rows = [("phase_ms", phase, summary) for phase, summary in report["phases"].items()]
+                rows.append(("round_ms", "round", report["round"]))
+                rows.append(("net_blocks", "round", report["net_blocks_per_round"]))
+                for kind, name, summary in rows:
+                    writer.writerow([kind, name] + [summary[column] for column in columns])
+                writer.writerow(["gc", "collections", report["gc_collections"]])
+                for counter, value in report["counters"].items():
+                    writer.writerow(["counter", counter, value])
+        else:
+            with open(path, "w") as report_file:
+                json.dump(report, report_file, indent=2)
+        return report
+
+    def close(self):
+        """
+                Export the report to the file given at creation, if any.
+
+                Parameters: N/A
+                Returns: report (dict) : Telemetry report
+        """
+        if self.path:
+            return self.export(self.path)
+        return self.report()
+
+
+def make_telemetry(path=None):
+    """
+            Create telemetry for a game loop: on when a file is given or when PACMAN_TELEMETRY names one,
+            off otherwise.
+
+            Parameters: path (str) : File to export to at the end of the game (optional)
+            Returns: telemetry (Telemetry/ NullTelemetry) : Telemetry
+    """
+    path = path or os.environ.get(TELEMETRY_VARIABLE)
+    if path:
+        return Telemetry(path)
+    return NullTelemetry()
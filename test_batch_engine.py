@@ -0,0 +1,85 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from batch_engine import BatchGames
+from engine import GameState, CounterRandom, POLICIES
+from main import read_board
+from maze import generate_maze, write_board
+from pathfinding import load_next_hops
+
+SEEDS = range(300)
+MAX_ROUNDS = 300
+STRATEGIES = {
+    "default": None,
+    "greedy": ["greedy"],
+    "shortest": ["shortest"],
+    "mixed": ["random", "greedy", "shortest", "alternating", "scatter"],
+}
+
+
+def scalar_results(board, policy, next_hops, strategies):
+    """
+            Play every seed with the scalar engine, drawing random numbers like the batch engine.
+
+            Parameters: board (Board) : Game board
+                        policy (str) : Pacman's policy, "random" or "dots"
+                        next_hops (NextHops) : Shortest path table (optional)
+                        strategies (list) : Names of the Ghosts' strategies
+            Returns: results (list) : GameState.stats of every game
+    """
+    results = []
+    for seed in SEEDS:
+        state = GameState(board, max_rounds=MAX_ROUNDS, next_hops=next_hops, rng=CounterRandom(seed),
+                          strategies=strategies)
+        while state.step(POLICIES[policy](state)) is None:
+            pass
+        results.append(state.stats())
+    return results
+
+
+def batch_results(board, policy, next_hops, strategies):
+    """
+            Play every seed in lockstep with the batch engine.
+
+            Parameters: board, policy, next_hops, strategies : See scalar_results
+            Returns: results (list) : BatchGames.results
+    """
+    batch = BatchGames(board, SEEDS, MAX_ROUNDS, next_hops=next_hops, strategies=strategies)
+    while batch.step(policy=policy):
+        pass
+    return batch.results()
+
+
+@pytest.fixture(scope="module", params=["pacman_board.txt", "maze"])
+def board(request, tmp_path_factory):
+    """
+            Boards to play on: the shipped board, and a generated maze with more Ghosts than strategies.
+
+            Parameters: request (pytest.FixtureRequest) : "pacman_board.txt" or "maze"
+                        tmp_path_factory (pytest.TempPathFactory) : Directory for the generated maze
+            Returns: board (Board) : Game board
+    """
+    if request.param == "maze":
+        path = tmp_path_factory.mktemp("boards") / "maze.txt"
+        write_board(str(path), generate_maze(40, 25, seed=3, ghosts=7))
+        return read_board(str(path))
+    return read_board(request.param)
+
+
+@pytest.mark.parametrize("strategies", STRATEGIES.values(), ids=STRATEGIES.keys())
+@pytest.mark.parametrize("policy", ["dots", "random"])
+def test_batch_matches_scalar_engine(board, policy, strategies):
+    """
+            Both engines play the same games, Ghosts chasing along the maze.
+    """
+    next_hops = load_next_hops(board, cache_dir=None)
+    assert batch_results(board, policy, next_hops, strategies) == scalar_results(board, policy, next_hops, strategies)
+
+
+def test_batch_matches_scalar_engine_without_next_hops(board):
+    """
+            Both engines play the same games when chasing Ghosts have no shortest path table.
+    """
+    assert batch_results(board, "dots", None, ["greedy", "shortest"]) == scalar_results(board, "dots", None,
+                                                                                        ["greedy", "shortest"])
@@ -0,0 +1,110 @@
+import os
+
+import pytest
+
+from loader import cache_path, load_board, load_compiled_board, parse_board
+
+BOARD = "#####\n#G.X#\n#. .#\n#####\n"
+
+
+def write(path, text):
+    """
+            Write a text board.
+
+            Parameters: path (pathlib.Path) : File to write
+                        text (str) : Board file content
+            Returns: path (str) : Path of the written file
+    """
+    path.write_text(text)
+    return str(path)
+
+
+def test_parse_board_finds_heroes_dots_and_strategies():
+    """
+            Heroes, dots and the strategies line are read in one pass, trailing empty lines are ignored.
+    """
+    board, entities, dots = parse_board((BOARD + "ghosts: greedy,scatter random\n\n\n").encode("ascii"))
+    assert (board.width, board.height) == (5, 4)
+    assert board.rows() == BOARD.splitlines()
+    assert entities.pacman == [1, 1]
+    assert entities.ghosts == [[1, 3]]
+    assert dots == 3
+    assert board.ghost_strategies == ["greedy", "scatter", "random"]
+
+
+@pytest.mark.parametrize("text, message", [
+    ("#####\n#G.#\n#####\n", "Row 1 has 4 tiles, expected 5"),
+    ("#####\n\n#G.X#\n", "Row 1 has 0 tiles, expected 5"),
+    ("#####\n#G?X#\n#####\n", "Row 1 has an illegal tile '?' at column 2"),
+])
+def test_parse_board_rejects_bad_rows(text, message):
+    """
+            Rows that are not rectangular or hold illegal tiles are reported with their row number.
+    """
+    with pytest.raises(ValueError, match=message.replace("?", r"\?")):
+        parse_board(text.encode("ascii"))
+
+
+def test_load_board_compiles_and_reuses_the_board(tmp_path):
+    """
+            The first load writes a compiled board that later loads read instead of the text file.
+    """
+    text_file = write(tmp_path / "board.txt", BOARD + "ghosts: scatter\n")
+    board, entities, dots = load_board(text_file)
+    assert os.path.exists(cache_path(text_file))
+    stat = os.stat(text_file)
+    compiled, compiled_entities, compiled_dots = load_compiled_board(cache_path(text_file), stat.st_size,
+                                                                     stat.st_mtime_ns)
+    assert compiled.tiles == board.tiles
+    assert compiled.moves == board.moves
+    assert compiled.ghost_strategies == ["scatter"]
+    assert (compiled_entities.pacman, compiled_entities.ghosts, compiled_dots) == (entities.pacman,
+                                                                                  entities.ghosts, dots)
+
+
+def test_load_board_without_cache_writes_nothing(tmp_path):
+    """
+            cache=False parses the text file and leaves no compiled board behind.
+    """
+    text_file = write(tmp_path / "board.txt", BOARD)
+    load_board(text_file, cache=False)
+    assert not os.path.exists(cache_path(text_file))
+
+
+def test_compiled_board_is_stale_when_size_changes(tmp_path):
+    """
+            A text file edited to a new size is parsed again.
+    """
+    text_file = write(tmp_path / "board.txt", BOARD)
+    load_board(text_file)
+    write(tmp_path / "board.txt", "#######\n#G...X#\n#######\n")
+    board, _, dots = load_board(text_file)
+    assert (board.width, dots) == (7, 3)
+
+
+def test_compiled_board_is_stale_when_mtime_changes(tmp_path):
+    """
+            A text file edited in place to the same size is parsed again, found by its modification time.
+    """
+    text_file = write(tmp_path / "board.txt", BOARD)
+    load_board(text_file)
+    stat = os.stat(text_file)
+    write(tmp_path / "board.txt", BOARD.replace(".", " "))
+    os.utime(text_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert load_compiled_board(cache_path(text_file), stat.st_size, stat.st_mtime_ns + 10 ** 9)[0] is None
+    _, _, dots = load_board(text_file)
+    assert dots == 0
+
+
+def test_damaged_compiled_board_is_ignored(tmp_path):
+    """
+            A truncated compiled board is treated as missing and rebuilt.
+    """
+    text_file = write(tmp_path / "board.txt", BOARD)
+    load_board(text_file)
+    compiled_file = cache_path(text_file)
+    with open(compiled_file, "r+b") as compiled:
+        compiled.truncate(os.path.getsize(compiled_file) - 1)
+    assert load_compiled_board(compiled_file)[0] is None
+    board, _, dots = load_board(text_file)
+    assert (board.rows(), dots) == (BOARD.splitlines(), 3)
@@ -0,0 +1,52 @@
+import pytest
+
+from engine import GameState, DEFEAT
+from main import read_board
+from mcts import MctsPlayer, dot_distances, rollout_reward, DEFAULT_DEPTH
+
+WINDOW = 150
+
+
+@pytest.fixture(scope="module")
+def board():
+    """
+            The shipped board.
+
+            Parameters: N/A
+            Returns: board (Board) : Game board
+    """
+    return read_board("pacman_board.txt")
+
+
+def test_rollout_reward_prefers_dots_to_idling(board):
+    """
+            A rollout that ate dots beats one that survived without eating, and surviving is worth less and
+            less the longer the game went without Pacman eating.
+    """
+    state = GameState(board, seed=0)
+    root = state.snapshot()
+    distances = dot_distances(state, DEFAULT_DEPTH)
+    state.rounds += DEFAULT_DEPTH
+    idle = rollout_reward(state, root, DEFAULT_DEPTH, distances)
+    stalled = rollout_reward(state, root, DEFAULT_DEPTH, distances, stalled=100)
+    state.dots_counter -= 5
+    eating = rollout_reward(state, root, DEFAULT_DEPTH, distances)
+    state.outcome = DEFEAT
+    caught = rollout_reward(state, root, DEFAULT_DEPTH, distances, stalled=100)
+    assert stalled < idle < eating
+    assert stalled < caught
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_mcts_keeps_eating_dots(board, seed):
+    """
+            With a small budget, the dots left drop in every window of WINDOW rounds until the game ends, so the
+            autopilot never settles for hiding from the Ghosts.
+    """
+    player = MctsPlayer(budget=0.005, seed=seed)
+    state = GameState(board, seed, max_rounds=3000)
+    dots_left = state.dots_counter
+    while state.step(player(state)) is None:
+        if state.rounds % WINDOW == 0:
+            assert state.dots_counter < dots_left, f"no dot eaten in rounds {state.rounds - WINDOW}-{state.rounds}"
+            dots_left = state.dots_counter
@@ -0,0 +1,75 @@
+import pytest
+
+from board import MOVES
+from main import read_board
+from maze import generate_maze, write_board
+from pathfinding import NO_MOVE, NextHops, load_next_hops
+
+# Two rooms without a door between them, open places on the border
+ROOMS = ".G.#..\n...#.X\n.#.#..\n"
+
+
+def distances_from(board, index):
+    """
+            Distances along the maze from one place, by a plain breadth-first search.
+
+            Parameters: board (Board) : Game board
+                        index (int) : Flat index of the place to start from
+            Returns: distances (dict) : Distance per flat index of the places reached
+    """
+    distances = {index: 0}
+    queue = [index]
+    for place in queue:
+        for direction in MOVES[board.moves[place]]:
+            neighbour = place + board.offsets[direction]
+            if neighbour not in distances:
+                distances[neighbour] = distances[place] + 1
+                queue.append(neighbour)
+    return distances
+
+
+@pytest.fixture(params=["pacman_board.txt", "maze", "rooms"])
+def board(request, tmp_path):
+    """
+            Boards to build tables for: the shipped board, a generated maze and two rooms out of reach of
+            each other.
+
+            Parameters: request (pytest.FixtureRequest) : "pacman_board.txt", "maze" or "rooms"
+                        tmp_path (pathlib.Path) : Directory for the generated boards
+            Returns: board (Board) : Game board
+    """
+    path = tmp_path / "board.txt"
+    if request.param == "maze":
+        write_board(str(path), generate_maze(30, 20, seed=1))
+    elif request.param == "rooms":
+        path.write_text(ROOMS)
+    else:
+        return read_board(request.param)
+    return read_board(str(path))
+
+
+def test_next_hops_step_closer_to_the_target(board):
+    """
+            Every next hop is a legal move one step closer to the target, and there is none exactly when the
+            target is out of reach or already there.
+    """
+    next_hops = NextHops(board)
+    for target_id, target in enumerate(next_hops.cells):
+        distances = distances_from(board, target)
+        row = next_hops.next_hops[target_id * next_hops.size:(target_id + 1) * next_hops.size]
+        for place_id, place in enumerate(next_hops.cells):
+            direction = row[place_id]
+            if place == target or place not in distances:
+                assert direction == NO_MOVE
+            else:
+                assert board.moves[place] >> direction & 1
+                assert distances[place + board.offsets[direction]] == distances[place] - 1
+
+
+def test_load_next_hops_reads_the_cached_table(board, tmp_path):
+    """
+            The table written to the cache is read back the same.
+    """
+    built = load_next_hops(board, cache_dir=str(tmp_path / "cache"))
+    cached = load_next_hops(board, cache_dir=str(tmp_path / "cache"))
+    assert cached.next_hops == built.next_hops
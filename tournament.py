@@ -0,0 +1,200 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from engine import GameState, POLICIES, VICTORY, DEFEAT, TIMEOUT
+from ghosts import parse_strategies
+from loader import load_board
+from pathfinding import load_next_hops
+
+OUTCOMES = (VICTORY, DEFEAT, TIMEOUT)
+CHASE_MODES = ("greedy", "shortest")
+
+# Boards and their starting positions loaded once per worker process by _init_worker, next hop tables built or
+# loaded once by the parent process and handed over by _init_worker
+_boards = {}
+_entities = {}
+_next_hops = {}
+
+
+def make_games(board_paths, policies, ghost_counts, games_per_config, seed=0, chase_modes=("greedy",),
+               strategy_sets=(None,)):
+    """
+            Build the list of games of a tournament. Every combination of board, policy, number of Ghosts, chase
+            mode and Ghosts' strategies is played games_per_config times. The seed of a game depends only on its
+            index, so results do not depend on how games are spread over workers.
+
+            Parameters: board_paths (list) : Text files with game boards
+                        policies (list) : Names of Pacman policies from engine.POLICIES
+                        ghost_counts (list) : Numbers of Ghosts to keep from the board (None keeps all of them)
+                        games_per_config (int) : Number of games per combination
+                        seed (int) : Seed of the first game
+                        chase_modes (list) : "greedy" (straight line) and/ or "shortest" (shortest path) chase
+                        strategy_sets (list) : Ghosts' strategies as strings like "random,scatter", None for the
+                                               board file's or the default ones
+            Returns: games (list) : Tuples (config, seed) where config is (board_path, policy, ghosts, chase,
+                                    strategies)
+    """
+    games = []
+    for board_path in board_paths:
+        for policy in policies:
+            for ghosts in ghost_counts:
+                for chase in chase_modes:
+                    for strategies in strategy_sets:
+                        config = (board_path, policy, ghosts, chase, strategies)
+                        for _ in range(games_per_config):
+                            games.append((config, seed + len(games)))
+    return games
+
+
+def _init_worker(board_paths, next_hops):
+    """
+            Load every board once when a worker process starts.
+
+            Parameters: board_paths (list) : Text files with game boards
+                        next_hops (dict) : Shortest path table (NextHops) per board played with the shortest chase
+            Returns: N/A
+    """
+    for board_path in board_paths:
+        _boards[board_path], _entities[board_path], _ = load_board(board_path)
+    _next_hops.update(next_hops)
+
+
+def _play_chunk(chunk, max_rounds):
+    """
+            Play a chunk of games in a worker process.
+
+            Parameters: chunk (list) : Tuples (config, seed) from make_games
+                        max_rounds (int) : Number of rounds after which a game ends with a timeout
+            Returns: pid (int) : Worker process id
+                     seconds (float) : Time spent playing the chunk
+                     results (list) : Tuples (config, outcome, rounds) in chunk order
+    """
+    start = time.perf_counter()
+    results = []
+    for config, seed in chunk:
+        board_path, policy, ghosts, chase, strategies = config
+        next_hops = _next_hops[board_path] if chase == "shortest" else None
+        state = GameState(_boards[board_path], seed, max_rounds, ghosts, next_hops, entities=_entities[board_path],
+                          strategies=strategies)
+        step = state.step
+        choose = POLICIES[policy]
+        while step(choose(state)) is None:
+            pass
+        results.append((config, state.outcome, state.rounds))
+    return os.getpid(), time.perf_counter() - start, results
+
+
+def iter_chunks(games, workers=None, chunk_size=256, max_rounds=1000):
+    """
+            Spread games over a pool of worker processes and yield results chunk by chunk as they finish.
+
+            Parameters: games (list) : Tuples (config, seed) from make_games
+                        workers (int) : Number of worker processes (number of CPUs by default)
+                        chunk_size (int) : Number of games sent to a worker at once
+                        max_rounds (int) : Number of rounds after which a game ends with a timeout
+            Returns: generator of (pid, seconds, results) tuples, see _play_chunk
+    """
+    board_paths = sorted({config[0] for config, _ in games})
+    # Built once here rather than by every worker, which would all miss a cold cache at the same time
+    next_hops = {board_path: load_next_hops(load_board(board_path)[0])
+                 for board_path in sorted({config[0] for config, _ in games if config[3] == "shortest"})}
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(board_paths, next_hops)) as executor:
+        futures = [executor.submit(_play_chunk, games[start:start + chunk_size], max_rounds)
+                   for start in range(0, len(games), chunk_size)]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def run_tournament(games, workers=None, chunk_size=256, max_rounds=1000):
+    """
+            Play a tournament and aggregate its results.
+
+            Parameters: games (list) : Tuples (config, seed) from make_games
+                        workers (int) : Number of worker processes (number of CPUs by default)
+                        chunk_size (int) : Number of games sent to a worker at once
+                        max_rounds (int) : Number of rounds after which a game ends with a timeout
+            Returns: report (dict) : Per configuration win/defeat/timeout rates and average rounds,
+                                     per worker throughput and totals.
+    """
+    start = time.perf_counter()
+    configs = {}
+    per_worker = {}
+    for pid, seconds, results in iter_chunks(games, workers, chunk_size, max_rounds):
+        worker = per_worker.setdefault(pid, {"games": 0, "steps": 0, "seconds": 0.0})
+        worker["seconds"] += seconds
+        for config, outcome, rounds in results:
+            totals = configs.setdefault(config, {VICTORY: 0, DEFEAT: 0, TIMEOUT: 0, "games": 0, "rounds": 0})
+            totals[outcome] += 1
+            totals["games"] += 1
+            totals["rounds"] += rounds
+            worker["games"] += 1
+            worker["steps"] += rounds
+    seconds = time.perf_counter() - start
+
+    report = {"configs": [], "workers": [], "games": len(games), "seconds": seconds}
+    for (board_path, policy, ghosts, chase, strategies), totals in sorted(configs.items(),
+                                                                          key=lambda item: repr(item[0])):
+        entry = {"board": board_path, "policy": policy, "ghosts": ghosts, "chase": chase, "strategies": strategies,
+                 "games": totals["games"], "average_rounds": totals["rounds"] / totals["games"]}
+        for outcome in OUTCOMES:
+            entry[outcome + "_rate"] = totals[outcome] / totals["games"]
+        report["configs"].append(entry)
+    for pid, worker in sorted(per_worker.items()):
+        worker["pid"] = pid
+        worker["steps_per_second"] = worker["steps"] / worker["seconds"] if worker["seconds"] else 0.0
+        report["workers"].append(worker)
+    report["steps"] = sum(worker["steps"] for worker in report["workers"])
+    report["steps_per_second"] = report["steps"] / seconds if seconds else 0.0
+    return report
+
+
+def strategy_set(text):
+    """
+            Check a command line set of Ghosts' strategies.
+
+            Parameters: text (str) : Strategy names separated by commas
+            Returns: text (str) : Normalised set, names separated by commas
+    """
+    try:
+        return ",".join(parse_strategies(text))
+    except ValueError as error:
+        raise argparse.ArgumentTypeError(str(error))
+
+
+def print_report(report):
+    """
+            Display tournament report.
+
+            Parameters: report (dict) : Report from run_tournament
+            Returns: N/A
+    """
+    for entry in report["configs"]:
+        strategies = f" strategies={entry['strategies']}" if entry["strategies"] else ""
+        print(f"{entry['board']} policy={entry['policy']} ghosts={entry['ghosts']} chase={entry['chase']}{strategies}: "
+              f"wins {entry['victory_rate']:.1%}, defeats {entry['defeat_rate']:.1%}, "
+              f"timeouts {entry['timeout_rate']:.1%}, average rounds {entry['average_rounds']:.1f}")
+    for worker in report["workers"]:
+        print(f"worker {worker['pid']}: {worker['games']} games, {worker['steps_per_second']:.0f} steps/s")
+    print(f"Total: {report['games']} games, {report['steps']} steps in {report['seconds']:.2f} s "
+          f"({report['steps_per_second']:.0f} steps/s)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Play seeded Pacman games on all CPU cores.")
+    parser.add_argument("boards", nargs="*", default=["pacman_board.txt"])
+    parser.add_argument("--policies", nargs="+", default=sorted(POLICIES), choices=sorted(POLICIES))
+    parser.add_argument("--ghosts", nargs="+", type=int, default=[1, 2, 3])
+    parser.add_argument("--chase", nargs="+", default=["greedy"], choices=CHASE_MODES)
+    parser.add_argument("--strategies", nargs="+", default=[None], type=strategy_set,
+                        help="Ghosts' strategies to compare, each one like random,shortest,scatter")
+    parser.add_argument("--games", type=int, default=1000, help="games per configuration")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=256)
+    parser.add_argument("--max-rounds", type=int, default=1000)
+    args = parser.parse_args()
+    print_report(run_tournament(make_games(args.boards, args.policies, args.ghosts, args.games, args.seed,
+                                           args.chase, args.strategies),
+                                args.workers, args.chunk_size, args.max_rounds))